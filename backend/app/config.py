@@ -7,7 +7,7 @@ All secrets and tunables are managed here.
 
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, Literal
 import os
 
 
@@ -34,18 +34,98 @@ class Settings(BaseSettings):
     )
     LLM_TEMPERATURE: float = Field(default=0.2, ge=0.0, le=1.0)
     LLM_MAX_TOKENS: int = Field(default=768, ge=64, le=4096)
+    LLM_JSON_MODE: bool = Field(
+        default=True,
+        description="Request response_format=json_object so replies are strict JSON",
+    )
+    LLM_MAX_RESPONSE_CHARS: int = Field(
+        default=64000,
+        ge=1000,
+        le=1_000_000,
+        description="Responses longer than this skip JSON repair and use the raw-text fallback",
+    )
     OPENROUTER_TIMEOUT_SECONDS: float = Field(default=45.0, ge=5.0, le=120.0)
+    LLM_PROMPT_CACHE_CONTROL: bool = Field(
+        default=False,
+        description="Mark the system prompt with an ephemeral cache_control breakpoint (Anthropic/Gemini models)",
+    )
 
     # ── Embedding ───────────────────────────────────────────────────
     EMBEDDING_MODEL: str = Field(
         default="sentence-transformers/all-MiniLM-L6-v2",
         description="HuggingFace sentence-transformer model for embeddings",
     )
+    EMBEDDING_BACKEND: Literal["torch", "onnx"] = Field(
+        default="torch",
+        description="'torch' (SentenceTransformer FP32) or 'onnx' (int8 onnxruntime export)",
+    )
+    EMBEDDING_ONNX_PATH: str = Field(
+        default=os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "onnx_embedder"),
+        description="Directory holding the quantized ONNX export (python -m app.services.onnx_export)",
+    )
+    EMBEDDING_THREADS: int = Field(
+        default=0,
+        ge=0,
+        le=64,
+        description="onnxruntime intra-op threads (0 = one per physical core)",
+    )
 
     # ── RAG Tuning ──────────────────────────────────────────────────
     CHUNK_SIZE: int = Field(default=1000, ge=200, le=4000)
     CHUNK_OVERLAP: int = Field(default=200, ge=0, le=1000)
     TOP_K: int = Field(default=3, ge=1, le=20)
+    FAISS_BATCH_WINDOW_MS: float = Field(
+        default=10.0,
+        ge=0.0,
+        le=100.0,
+        description="Time window for coalescing concurrent retrievals (0 disables batching)",
+    )
+    FAISS_BATCH_MAX: int = Field(default=32, ge=1, le=256)
+    FAISS_IVF_MIN_VECTORS: int = Field(
+        default=10000,
+        ge=1000,
+        description="Corpora at least this large are indexed with IVF-PQ; smaller ones with HNSW",
+    )
+    FAISS_NPROBE: int = Field(default=16, ge=1, le=1024, description="IVF lists probed per query")
+    FAISS_HNSW_EF_SEARCH: int = Field(default=64, ge=8, le=1024)
+    FAISS_MLOCK: bool = Field(
+        default=False,
+        description="Lock process memory (incl. the FAISS index) in RAM after loading; needs RLIMIT_MEMLOCK",
+    )
+
+    THREADPOOL_WORKERS: int = Field(
+        default=8,
+        ge=1,
+        le=64,
+        description="Worker threads for CPU-bound request work (sanitising, embedding, FAISS)",
+    )
+
+    # ── Response Cache ──────────────────────────────────────────────
+    RESPONSE_CACHE_MAXSIZE: int = Field(
+        default=4096,
+        ge=0,
+        le=100000,
+        description="Max cached /ask responses (0 disables the cache)",
+    )
+    RESPONSE_CACHE_TTL_SECONDS: float = Field(default=3600.0, ge=1.0, le=86400.0)
+    LLM_CACHE_MAXSIZE: int = Field(
+        default=2048,
+        ge=0,
+        le=100000,
+        description="Max cached LLM responses keyed on query + retrieved chunks (0 disables)",
+    )
+    LLM_CACHE_TTL_SECONDS: float = Field(default=86400.0, ge=1.0, le=7 * 86400.0)
+    LLM_SEMANTIC_CACHE_ENABLED: bool = Field(
+        default=False,
+        description="Answer close paraphrases of cached queries from the cache",
+    )
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = Field(
+        default=0.92,
+        ge=0.5,
+        le=1.0,
+        description="Minimum cosine similarity for a semantic cache hit",
+    )
+    LLM_SEMANTIC_CACHE_MAXSIZE: int = Field(default=1024, ge=1, le=100000)
 
     # ── Paths ───────────────────────────────────────────────────────
     PDF_DIRECTORY: str = Field(
@@ -60,6 +140,24 @@ class Settings(BaseSettings):
         default=os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "feedback.jsonl"),
         description="Path to store user feedback",
     )
+    FEEDBACK_FLUSH_MS: int = Field(
+        default=500,
+        ge=50,
+        le=60000,
+        description="Interval for flushing buffered feedback to disk",
+    )
+    FEEDBACK_FLUSH_MAX: int = Field(
+        default=100,
+        ge=1,
+        le=10000,
+        description="Flush buffered feedback early once this many entries are pending",
+    )
+    FEEDBACK_BUFFER_MAX: int = Field(
+        default=10000,
+        ge=1,
+        le=1_000_000,
+        description="Most entries kept for retry while feedback writes keep failing",
+    )
 
     # ── Security ────────────────────────────────────────────────────
     MAX_QUERY_LENGTH: int = Field(default=2000, ge=10, le=10000)
@@ -69,6 +167,14 @@ class Settings(BaseSettings):
         description="Rate limit per IP address (slowapi format)",
     )
 
+    # ── Logging ─────────────────────────────────────────────────────
+    STATS_LOG_INTERVAL_SECONDS: float = Field(
+        default=60.0,
+        ge=1.0,
+        le=3600.0,
+        description="Interval for the aggregated request-count log line",
+    )
+
     # ── CORS ────────────────────────────────────────────────────────
     CORS_ORIGINS: List[str] = Field(
         default=["http://localhost:5173", "http://localhost:3000", "*"],
@@ -11,16 +11,19 @@ Endpoints:
 
 from __future__ import annotations
 
-import json
+import asyncio
 import time
-from collections import defaultdict
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
+import orjson
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from loguru import logger
 
 from app.config import settings
@@ -32,7 +35,8 @@ from app.models.schemas import (
     SourceChunk,
 )
 from app.rag.retriever import retriever
-from app.services.llm_service import call_llm, stream_llm_events
+from app.services.llm_service import call_llm, close_client, stream_llm_events
+from app.utils.response_cache import make_response_key, response_cache
 from app.utils.security import sanitize_input, validate_query_length
 
 # ── Configure logging ────────────────────────────────────────────────────
@@ -42,32 +46,165 @@ logger.add(
     retention="7 days",
     level="INFO",
     format="{time:YYYY-MM-DD HH:mm:ss} | {level:<8} | {name}:{function}:{line} - {message}",
+    enqueue=True,      # write from a background thread, not the request path
+    buffering=8192,
 )
 
+# Per-request events are logged at DEBUG; INFO gets a periodic summary instead.
+_request_stats: Counter[str] = Counter()
 
-# ── Simple in-memory rate limiter ────────────────────────────────────────
-_rate_limit_store: dict[str, list[float]] = defaultdict(list)
+
+def _log_preview(text: str, limit: int = 100) -> str:
+    """Truncate a query for log output."""
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+async def _log_request_stats() -> None:
+    """Emit an aggregated request count every STATS_LOG_INTERVAL_SECONDS."""
+    interval = settings.STATS_LOG_INTERVAL_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        if _request_stats:
+            logger.info(
+                "Requests in the last {s}s: {stats}",
+                s=interval,
+                stats=dict(_request_stats),
+            )
+            _request_stats.clear()
+
+
+# ── Simple in-memory rate limiter (token bucket) ─────────────────────────
+# Each client IP maps to (tokens, last_ts). Buckets hold up to RATE_LIMIT_MAX
+# tokens and refill continuously at RATE_LIMIT_MAX per RATE_LIMIT_WINDOW.
+# The store is kept in least-recently-admitted order and capped at
+# RATE_LIMIT_MAX_CLIENTS entries, so a flood of distinct IPs can't grow it
+# without bound.
+_rate_limit_store: OrderedDict[str, tuple[float, float]] = OrderedDict()
 RATE_LIMIT_MAX = 10       # max requests
 RATE_LIMIT_WINDOW = 60    # per 60 seconds
+RATE_LIMIT_MAX_CLIENTS = 50_000
+RATE_LIMIT_SWEEP_INTERVAL = 30  # seconds between evictions of idle clients
+_RATE_LIMIT_REFILL = RATE_LIMIT_MAX / RATE_LIMIT_WINDOW
 
 
 def _check_rate_limit(client_ip: str) -> bool:
     """Return True if the client is within rate limits, False if exceeded."""
-    now = time.time()
-    timestamps = _rate_limit_store[client_ip]
-    # Remove entries outside the window
-    _rate_limit_store[client_ip] = [t for t in timestamps if now - t < RATE_LIMIT_WINDOW]
-    if len(_rate_limit_store[client_ip]) >= RATE_LIMIT_MAX:
+    now = time.monotonic()
+    state = _rate_limit_store.get(client_ip)
+    if state is None:
+        tokens = float(RATE_LIMIT_MAX)
+    else:
+        tokens, last_ts = state
+        tokens = min(RATE_LIMIT_MAX, tokens + (now - last_ts) * _RATE_LIMIT_REFILL)
+    if tokens < 1:
         return False
-    _rate_limit_store[client_ip].append(now)
+    _rate_limit_store[client_ip] = (tokens - 1, now)
+    _rate_limit_store.move_to_end(client_ip)
+    if len(_rate_limit_store) > RATE_LIMIT_MAX_CLIENTS:
+        _rate_limit_store.popitem(last=False)
     return True
 
 
+async def _sweep_rate_limit_store() -> None:
+    """Periodically drop clients idle for a full window (their bucket is full again)."""
+    while True:
+        await asyncio.sleep(RATE_LIMIT_SWEEP_INTERVAL)
+        cutoff = time.monotonic() - RATE_LIMIT_WINDOW
+        evicted = 0
+        # Oldest entries come first, so stop at the first active client.
+        while _rate_limit_store:
+            _, (_, last_ts) = next(iter(_rate_limit_store.items()))
+            if last_ts >= cutoff:
+                break
+            _rate_limit_store.popitem(last=False)
+            evicted += 1
+        if evicted:
+            logger.debug("Evicted {n} idle rate-limit entries.", n=evicted)
+
+
+# ── Buffered feedback writer ─────────────────────────────────────────────
+# Feedback lines are serialised eagerly and appended to an in-memory buffer;
+# a background task writes them out in one batch every FEEDBACK_FLUSH_MS or
+# as soon as FEEDBACK_FLUSH_MAX lines are pending.
+_feedback_buffer: list[str] = []
+_feedback_flush_event = asyncio.Event()
+
+
+_last_ts_sec = -1
+_last_ts_str = ""
+
+
+def _feedback_timestamp(ts_ns: int) -> str:
+    """Naive-UTC ISO timestamp (second precision), formatted once per second."""
+    global _last_ts_sec, _last_ts_str
+    sec = ts_ns // 1_000_000_000
+    if sec != _last_ts_sec:
+        _last_ts_str = datetime.fromtimestamp(sec, tz=timezone.utc).replace(tzinfo=None).isoformat()
+        _last_ts_sec = sec
+    return _last_ts_str
+
+
+def _write_feedback_lines(lines: list[str]) -> None:
+    """Append a batch of JSON lines to the feedback file."""
+    feedback_path = Path(settings.FEEDBACK_FILE)
+    feedback_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(feedback_path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+async def _flush_feedback() -> None:
+    """Drain the feedback buffer to disk."""
+    if not _feedback_buffer:
+        return
+    # Swap without awaiting in between, so no appends are lost.
+    lines = _feedback_buffer[:]
+    _feedback_buffer.clear()
+    try:
+        await asyncio.to_thread(_write_feedback_lines, lines)
+    except Exception:
+        # Requeue ahead of newer entries so the next tick (or the shutdown
+        # flush) retries them; drop the oldest if the disk stays broken.
+        _feedback_buffer[:0] = lines
+        overflow = len(_feedback_buffer) - settings.FEEDBACK_BUFFER_MAX
+        if overflow > 0:
+            del _feedback_buffer[:overflow]
+            logger.error("Dropped {n} unwritten feedback entries.", n=overflow)
+        raise
+    logger.debug("Flushed {n} feedback entries.", n=len(lines))
+
+
+async def _feedback_flusher() -> None:
+    """Flush buffered feedback on a timer or when the buffer fills up."""
+    interval = settings.FEEDBACK_FLUSH_MS / 1000
+    while True:
+        try:
+            await asyncio.wait_for(_feedback_flush_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        _feedback_flush_event.clear()
+        try:
+            await _flush_feedback()
+        except Exception as exc:
+            logger.error("Error flushing feedback: {err}", err=exc)
+
+
+def _prepare_query(raw_query: str) -> str:
+    """Sanitise and validate a query (CPU-bound; run off the event loop)."""
+    clean_query = sanitize_input(raw_query, max_length=settings.MAX_QUERY_LENGTH)
+    validate_query_length(
+        clean_query,
+        min_length=settings.MIN_QUERY_LENGTH,
+        max_length=settings.MAX_QUERY_LENGTH,
+    )
+    return clean_query
+
+
 def _build_sources(chunks: list[dict]) -> list[SourceChunk]:
     """Map retrieved chunks to typed source metadata."""
+    # Retriever output is already well-typed, so skip validation.
     return [
-        SourceChunk(
-            text=c["text"][:300] + "..." if len(c["text"]) > 300 else c["text"],
+        SourceChunk.model_construct(
+            text=c["text_preview"],
             law=c.get("law", ""),
             section=c.get("section", ""),
             source=c.get("source", ""),
@@ -77,11 +214,34 @@ def _build_sources(chunks: list[dict]) -> list[SourceChunk]:
     ]
 
 
+def _sse_event(payload: dict) -> bytes:
+    """Encode a payload as a Server-Sent Events data frame."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
 # ── Lifespan (startup / shutdown) ────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load the FAISS index on startup."""
+    """Load the FAISS index on startup and stop background tasks on shutdown."""
     logger.info("NyayaAI starting up...")
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(
+            max_workers=settings.THREADPOOL_WORKERS,
+            thread_name_prefix="nyayaai",
+        )
+    )
+    background_tasks = [
+        asyncio.create_task(_sweep_rate_limit_store()),
+        asyncio.create_task(_feedback_flusher()),
+        asyncio.create_task(_log_request_stats()),
+    ]
+
+    if settings.EMBEDDING_BACKEND == "onnx":
+        # onnxruntime is light enough to load eagerly; warm it so the first
+        # query doesn't pay for session initialisation.
+        from app.services.embedding_service import embedding_service
+
+        await asyncio.to_thread(embedding_service.warmup)
 
     retriever.load_index()
     if retriever.is_loaded:
@@ -91,6 +251,15 @@ async def lifespan(app: FastAPI):
             "FAISS index not available. Run ingestion first: python -m app.rag.ingest"
         )
     yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    try:
+        await asyncio.shield(_flush_feedback())
+    except Exception as exc:
+        logger.error("Error flushing feedback on shutdown: {err}", err=exc)
+    await retriever.close()
+    await close_client()
     logger.info("NyayaAI shutting down.")
 
 
@@ -103,6 +272,7 @@ app = FastAPI(
     ),
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # ── CORS ─────────────────────────────────────────────────────────────────
@@ -115,6 +285,23 @@ app.add_middleware(
 )
 
 
+# ── Compression ──────────────────────────────────────────────────────────
+class _GZipMiddleware(GZipMiddleware):
+    """GZip responses, except SSE streams (gzip would hold tokens back in its buffer)."""
+
+    _UNCOMPRESSED_PATHS = frozenset({"/ask/stream"})
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"] in self._UNCOMPRESSED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Added after CORS so it wraps CORS; CORS preflights are far below minimum_size.
+app.add_middleware(_GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
 # ══════════════════════════════════════════════════════════════════════════
 # ENDPOINTS
 # ══════════════════════════════════════════════════════════════════════════
@@ -136,7 +323,8 @@ async def ask_question(body: AskRequest, request: Request):
     Submit a legal question and receive a structured, bilingual response.
 
     The endpoint:
-    1. Sanitises and validates the input.
+    1. Sanitises and validates the input (repeat questions are served
+       from the response cache).
     2. Retrieves relevant legal chunks from the FAISS index.
     3. Passes the context + query to the LLM via OpenRouter.
     4. Returns a structured response with disclaimer.
@@ -148,22 +336,25 @@ async def ask_question(body: AskRequest, request: Request):
 
     try:
         # ── 1. Sanitise & validate ───────────────────────────────────
-        clean_query = sanitize_input(body.query)
-        validate_query_length(
-            clean_query,
-            min_length=settings.MIN_QUERY_LENGTH,
-            max_length=settings.MAX_QUERY_LENGTH,
-        )
+        clean_query = await asyncio.to_thread(_prepare_query, body.query)
 
-        logger.info(
+        cache_key = make_response_key(clean_query, body.language.value)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            _request_stats["ask_cached"] += 1
+            logger.debug("Serving cached response ({lang}).", lang=body.language.value)
+            return cached
+
+        _request_stats["ask"] += 1
+        logger.opt(lazy=True).debug(
             "Received query ({lang}): {q}",
-            lang=body.language.value,
-            q=clean_query[:100] + "..." if len(clean_query) > 100 else clean_query,
+            lang=lambda: body.language.value,
+            q=lambda: _log_preview(clean_query),
         )
 
         # ── 2. Retrieve relevant chunks ──────────────────────────────
-        chunks = retriever.retrieve(clean_query)
-        logger.info("Retrieved {n} chunks from FAISS.", n=len(chunks))
+        chunks = await retriever.aretrieve(clean_query)
+        logger.debug("Retrieved {n} chunks from FAISS.", n=len(chunks))
 
         # ── 3. Call LLM ──────────────────────────────────────────────
         llm_response = await call_llm(
@@ -172,10 +363,10 @@ async def ask_question(body: AskRequest, request: Request):
             language=body.language.value,
         )
 
-        # ── 4. Build typed response ──────────────────────────────────
+        # ── 4. Build typed response (fields are normalised; skip validation)
         sources = _build_sources(chunks)
 
-        return AskResponse(
+        response = AskResponse.model_construct(
             summary=llm_response.get("summary", ""),
             relevant_law=llm_response.get("relevant_law", ""),
             your_rights=llm_response.get("your_rights", ""),
@@ -184,6 +375,15 @@ async def ask_question(body: AskRequest, request: Request):
             sources=sources,
             language=body.language,
         )
+        # Only pin real answers: not ones built without retrieved context
+        # (index not loaded) or the raw-text fallback for unparseable output.
+        if (
+            settings.RESPONSE_CACHE_MAXSIZE
+            and chunks
+            and (response.relevant_law or response.next_steps)
+        ):
+            response_cache.set(cache_key, response)
+        return response
 
     except ValueError as ve:
         logger.warning("Validation error: {err}", err=ve)
@@ -208,21 +408,17 @@ async def ask_question_stream(body: AskRequest, request: Request):
         raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
 
     try:
-        clean_query = sanitize_input(body.query)
-        validate_query_length(
-            clean_query,
-            min_length=settings.MIN_QUERY_LENGTH,
-            max_length=settings.MAX_QUERY_LENGTH,
-        )
+        clean_query = await asyncio.to_thread(_prepare_query, body.query)
 
-        logger.info(
+        _request_stats["ask_stream"] += 1
+        logger.opt(lazy=True).debug(
             "Received stream query ({lang}): {q}",
-            lang=body.language.value,
-            q=clean_query[:100] + "..." if len(clean_query) > 100 else clean_query,
+            lang=lambda: body.language.value,
+            q=lambda: _log_preview(clean_query),
         )
 
-        chunks = retriever.retrieve(clean_query)
-        logger.info("Retrieved {n} chunks from FAISS (stream).", n=len(chunks))
+        chunks = await retriever.aretrieve(clean_query)
+        logger.debug("Retrieved {n} chunks from FAISS (stream).", n=len(chunks))
 
         sources = _build_sources(chunks)
 
@@ -235,7 +431,7 @@ async def ask_question_stream(body: AskRequest, request: Request):
                 ):
                     if event.get("type") == "done":
                         parsed = event.get("response", {})
-                        final = AskResponse(
+                        final = AskResponse.model_construct(
                             summary=parsed.get("summary", ""),
                             relevant_law=parsed.get("relevant_law", ""),
                             your_rights=parsed.get("your_rights", ""),
@@ -245,16 +441,16 @@ async def ask_question_stream(body: AskRequest, request: Request):
                             language=body.language,
                         )
                         payload = {"type": "done", "response": final.model_dump(mode="json")}
-                        yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                        yield _sse_event(payload)
                     else:
-                        yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                        yield _sse_event(event)
             except Exception as exc:
                 logger.error("Error streaming query: {err}", err=exc)
                 payload = {
                     "type": "error",
                     "error": "An internal error occurred while processing your query. Please try again.",
                 }
-                yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                yield _sse_event(payload)
 
         return StreamingResponse(
             event_generator(),
@@ -274,7 +470,8 @@ async def ask_question_stream(body: AskRequest, request: Request):
 @app.post("/feedback", tags=["Feedback"])
 async def submit_feedback(body: FeedbackRequest, request: Request):
     """
-    Submit feedback on a response. Stored as JSON lines for later analysis.
+    Submit feedback on a response. Stored as JSON lines for later analysis
+    (buffered in memory and flushed to disk in batches).
     """
     # Rate limit check
     client_ip = request.client.host if request.client else "unknown"
@@ -282,20 +479,21 @@ async def submit_feedback(body: FeedbackRequest, request: Request):
         raise HTTPException(status_code=429, detail="Rate limit exceeded.")
 
     try:
+        ts_ns = time.time_ns()
         feedback_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _feedback_timestamp(ts_ns),
+            "ts_ns": ts_ns,
             "query": body.query,
             "rating": body.rating,
             "comment": body.comment,
         }
 
-        feedback_path = Path(settings.FEEDBACK_FILE)
-        feedback_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(feedback_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(feedback_data, ensure_ascii=False) + "\n")
+        _feedback_buffer.append(orjson.dumps(feedback_data).decode() + "\n")
+        if len(_feedback_buffer) >= settings.FEEDBACK_FLUSH_MAX:
+            _feedback_flush_event.set()
 
-        logger.info("Feedback recorded: rating={r}", r=body.rating)
+        _request_stats["feedback"] += 1
+        logger.debug("Feedback recorded: rating={r}", r=body.rating)
         return {"status": "success", "message": "Thank you for your feedback!"}
 
     except Exception as exc:
@@ -311,7 +509,7 @@ async def submit_feedback(body: FeedbackRequest, request: Request):
 async def global_exception_handler(request: Request, exc: Exception):
     """Catch-all exception handler for unhandled errors."""
     logger.error("Unhandled exception: {err}", err=exc)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "detail": "An unexpected error occurred. Please try again later.",
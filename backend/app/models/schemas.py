@@ -4,11 +4,16 @@ NyayaAI – Pydantic Schemas
 Request/response models for the API layer.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from enum import Enum
 
 
+# Schemas are immutable and reject unknown fields. Immutability also makes
+# it safe to share a response instance, e.g. from the response cache.
+_SCHEMA_CONFIG = ConfigDict(frozen=True, extra="forbid")
+
+
 class Language(str, Enum):
     """Supported languages for NyayaAI responses."""
     ENGLISH = "en"
@@ -17,6 +22,8 @@ class Language(str, Enum):
 
 class AskRequest(BaseModel):
     """Incoming user query for legal assistance."""
+    model_config = _SCHEMA_CONFIG
+
     query: str = Field(
         ...,
         min_length=5,
@@ -32,6 +39,8 @@ class AskRequest(BaseModel):
 
 class SourceChunk(BaseModel):
     """A single retrieved source chunk for transparency."""
+    model_config = _SCHEMA_CONFIG
+
     text: str = Field(..., description="Retrieved text excerpt")
     law: str = Field(default="", description="Name of the law/act")
     section: str = Field(default="", description="Section number")
@@ -41,6 +50,8 @@ class SourceChunk(BaseModel):
 
 class AskResponse(BaseModel):
     """Structured legal assistant response."""
+    model_config = _SCHEMA_CONFIG
+
     summary: str = Field(..., description="Plain-language explanation")
     relevant_law: str = Field(default="", description="Applicable law/act")
     your_rights: str = Field(default="", description="Rights of the citizen")
@@ -58,6 +69,8 @@ class AskResponse(BaseModel):
 
 class FeedbackRequest(BaseModel):
     """User feedback on a response."""
+    model_config = _SCHEMA_CONFIG
+
     query: str = Field(..., description="Original query")
     rating: int = Field(..., ge=1, le=5, description="Rating from 1 to 5")
     comment: Optional[str] = Field(default=None, max_length=1000, description="Optional comment")
@@ -65,6 +78,8 @@ class FeedbackRequest(BaseModel):
 
 class HealthResponse(BaseModel):
     """Health check response."""
+    model_config = _SCHEMA_CONFIG
+
     status: str = Field(default="ok")
     version: str = Field(default="1.0.0")
     service: str = Field(default="NyayaAI Legal Assistant")
@@ -0,0 +1,112 @@
+"""
+NyayaAI – Async Micro-Batcher
+===============================
+Collects items submitted by concurrent requests within a short time window
+and hands them to a synchronous batch handler in a single call.
+
+Used by the retriever so that N concurrent /ask requests share one
+embedding forward pass and FAISS search instead of N separate ones.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+
+class AsyncBatcher:
+    """
+    Micro-batcher backed by an asyncio.Queue of (item, Future) pairs.
+
+    A background task waits for the first item, keeps draining the queue
+    until either `max_batch` items are pending or `window_ms` has elapsed,
+    then runs `handler(items)` in a worker thread and resolves each Future
+    with the matching element of the returned sequence.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Sequence[Any]],
+        window_ms: float = 10.0,
+        max_batch: int = 32,
+    ) -> None:
+        self._handler = handler
+        self._window = window_ms / 1000.0
+        self._max_batch = max(1, max_batch)
+        self._queue: Optional[asyncio.Queue[Tuple[Any, asyncio.Future]]] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Batch currently being collected or dispatched by the worker.
+        self._batch: List[Tuple[Any, asyncio.Future]] = []
+
+    async def submit(self, item: Any) -> Any:
+        """Enqueue an item and wait for its result from the next batch."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def close(self) -> None:
+        """
+        Cancel the background worker (called on application shutdown) and
+        cancel every pending future, in-flight or still queued, so no
+        `submit()` caller is left waiting.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+        pending = self._batch
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            future.cancel()
+
+        self._batch = []
+        self._worker = None
+        self._queue = None
+
+    def _ensure_worker(self) -> None:
+        """Lazily start the worker on the running event loop."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch = batch = [await self._queue.get()]
+            deadline = loop.time() + self._window
+
+            while len(batch) < self._max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._dispatch(batch)
+            self._batch = []
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.to_thread(self._handler, items)
+        except Exception as exc:
+            logger.error("Batch handler failed for {n} items: {err}", n=len(items), err=exc)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Waiters may have been cancelled (e.g. client disconnected)
+            if not future.done():
+                future.set_result(result)
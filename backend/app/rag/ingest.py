@@ -9,14 +9,18 @@ Usage (from backend/ directory):
 
 from __future__ import annotations
 
+import json
+import math
 import os
 import re
 import sys
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Tuple
 
 import faiss
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from loguru import logger
 from pypdf import PdfReader
@@ -27,6 +31,7 @@ if str(_BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(_BACKEND_ROOT))
 
 from app.config import settings
+from app.rag.retriever import METADATA_FIELDS, apply_search_params, make_preview
 from app.services.embedding_service import embedding_service
 
 # ── Filename convention ──────────────────────────────────────────────────
@@ -145,6 +150,65 @@ def chunk_documents(
     return all_texts, all_metadatas
 
 
+def _pq_subquantizers(dimension: int) -> int:
+    """Largest PQ sub-quantizer count <= dim/4 that evenly divides the dimension."""
+    m = max(1, dimension // 4)
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def _build_index(embeddings: np.ndarray) -> Tuple[faiss.Index, Dict[str, Any]]:
+    """
+    Build an approximate nearest-neighbour index for the embeddings.
+
+    Large corpora (>= FAISS_IVF_MIN_VECTORS) get IVF-PQ, the only compressed
+    option here: 8-bit codes, ~4 dims per byte, to cut memory traffic per
+    query. Smaller ones get HNSWFlat, chosen for per-query speed, not size:
+    it keeps the full fp32 vectors plus graph links, so it is larger than
+    IndexFlatL2. Both are approximate; the recall cost against exact search
+    is recorded in index_stats.json.
+    """
+    n, dimension = embeddings.shape
+
+    if n >= settings.FAISS_IVF_MIN_VECTORS:
+        nlist = max(1, int(math.sqrt(n)))
+        m = _pq_subquantizers(dimension)
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, 8)
+        logger.info("Training IVF-PQ index (nlist={nlist}, m={m})...", nlist=nlist, m=m)
+        index.train(embeddings)
+        params = {"index_type": "IVFPQ", "nlist": nlist, "m": m, "nbits": 8}
+    else:
+        index = faiss.IndexHNSWFlat(dimension, 32)
+        params = {"index_type": "HNSWFlat", "M": 32}
+
+    index.add(embeddings)
+    apply_search_params(index)
+    return index, params
+
+
+def _measure_recall(
+    index: faiss.Index,
+    embeddings: np.ndarray,
+    k: int = 10,
+    sample_size: int = 200,
+) -> float:
+    """Recall@k of the ANN index against exact L2 search on a sample of the corpus."""
+    n, dimension = embeddings.shape
+    k = min(k, n)
+    rng = np.random.default_rng(0)
+    queries = embeddings[rng.choice(n, size=min(sample_size, n), replace=False)]
+
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(embeddings)
+    _, truth = exact.search(queries, k)
+    _, found = index.search(queries, k)
+
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / (len(queries) * k)
+
+
 def build_faiss_index(
     texts: List[str],
     metadatas: List[Dict[str, str]],
@@ -154,9 +218,9 @@ def build_faiss_index(
     Generate embeddings and build a FAISS index, persisting it to disk.
 
     Saves:
-        - index.faiss   – the FAISS flat index
-        - texts.npy     – numpy array of chunk texts
-        - metadatas.npy – numpy array of metadata dicts
+        - index.faiss       – the FAISS index (IVF-PQ or HNSW, see _build_index)
+        - metadatas.parquet – chunk text, display preview and metadata, one column per field
+        - index_stats.json  – index parameters and measured recall@10
     """
     index_path = index_path or settings.FAISS_INDEX_PATH
     out_dir = Path(index_path)
@@ -166,21 +230,35 @@ def build_faiss_index(
     embeddings = embedding_service.embed_texts(texts)
     embeddings_np = np.array(embeddings, dtype="float32")
 
-    # Build FAISS index (Flat L2 — exact search, fine for < 100k chunks)
     dimension = embeddings_np.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings_np)
+    index, params = _build_index(embeddings_np)
+    recall = _measure_recall(index, embeddings_np)
 
     # Persist
     faiss.write_index(index, str(out_dir / "index.faiss"))
-    np.save(str(out_dir / "texts.npy"), np.array(texts, dtype=object))
-    np.save(str(out_dir / "metadatas.npy"), np.array(metadatas, dtype=object))
+    columns = {"text": texts, "text_preview": [make_preview(t) for t in texts]}
+    for field in METADATA_FIELDS:
+        columns[field] = [meta.get(field, "") for meta in metadatas]
+    pq.write_table(pa.table(columns), str(out_dir / "metadatas.parquet"))
+
+    stats = {
+        **params,
+        "ntotal": index.ntotal,
+        "dim": dimension,
+        "nprobe": settings.FAISS_NPROBE,
+        "ef_search": settings.FAISS_HNSW_EF_SEARCH,
+        "recall_at_10": round(recall, 4),
+    }
+    with open(out_dir / "index_stats.json", "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
 
     logger.info(
-        "FAISS index saved to {path} ({n} vectors, dim={d})",
+        "FAISS index saved to {path} ({n} vectors, dim={d}, {t}, recall@10={r:.3f})",
         path=index_path,
         n=index.ntotal,
         d=dimension,
+        t=params["index_type"],
+        r=recall,
     )
 
 
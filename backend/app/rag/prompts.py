@@ -5,7 +5,10 @@ System and user prompt templates for the legal assistant.
 Designed to produce structured, bilingual responses with disclaimers.
 """
 
-from typing import Any, Dict, List
+import io
+from typing import Any, Callable, Dict, List
+
+from app.config import settings
 
 # ══════════════════════════════════════════════════════════════════════════
 # SYSTEM PROMPT
@@ -46,6 +49,17 @@ Example of the EXACT format expected:
 - If the question is not related to Indian law, politely redirect the user in the summary field.
 """
 
+# The system message is identical for every request, so it is built once and
+# always sent first. Providers with automatic prefix caching reuse it as-is;
+# Anthropic-style providers need an explicit cache_control breakpoint.
+_SYSTEM_MESSAGE: Dict[str, Any] = {"role": "system", "content": SYSTEM_PROMPT}
+_SYSTEM_MESSAGE_CACHE_CONTROL: Dict[str, Any] = {
+    "role": "system",
+    "content": [
+        {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+    ],
+}
+
 
 # ══════════════════════════════════════════════════════════════════════════
 # LANGUAGE INSTRUCTIONS
@@ -70,56 +84,102 @@ USER_PROMPT_TEMPLATE = """## Retrieved Legal Context:
 Now provide your response in the required JSON format."""
 
 
+_CHUNK_SEPARATOR = "\n\n---\n\n"
+_META_FIELDS = (
+    ("law", "Law: "),
+    ("section", "Section: "),
+    ("source", "Source: "),
+    ("category", "Category: "),
+)
+
+
 def _format_context(chunks: List[Dict[str, Any]]) -> str:
     """Format retrieved chunks into a readable context block."""
     if not chunks:
         return "No relevant legal documents were found in the knowledge base."
 
-    parts = []
+    buf = io.StringIO()
+    write = buf.write
     for i, chunk in enumerate(chunks, 1):
-        meta_parts = []
-        if chunk.get("law"):
-            meta_parts.append(f"Law: {chunk['law']}")
-        if chunk.get("section"):
-            meta_parts.append(f"Section: {chunk['section']}")
-        if chunk.get("source"):
-            meta_parts.append(f"Source: {chunk['source']}")
-        if chunk.get("category"):
-            meta_parts.append(f"Category: {chunk['category']}")
+        if i > 1:
+            write(_CHUNK_SEPARATOR)
+        write("[Source ")
+        write(str(i))
+        write("] (")
+
+        has_meta = False
+        for key, label in _META_FIELDS:
+            value = chunk.get(key)
+            if value:
+                if has_meta:
+                    write(" | ")
+                write(label)
+                write(str(value))
+                has_meta = True
+        if not has_meta:
+            write("Unknown source")
+
+        write(")\n")
+        write(str(chunk.get("text", "")))
+
+    return buf.getvalue()
+
+
+# ══════════════════════════════════════════════════════════════════════════
+# MESSAGE BUILDERS
+# ══════════════════════════════════════════════════════════════════════════
+MessageBuilder = Callable[[str, List[Dict[str, Any]]], List[Dict[str, Any]]]
+
+
+def _make_message_builder(language: str) -> MessageBuilder:
+    """
+    Build a message constructor specialised for one language.
+
+    The language instruction is baked into the user template up front (the
+    instructions contain no format braces), and the system message is
+    chosen once, so each call only formats context and query.
+    """
+    template = USER_PROMPT_TEMPLATE.replace(
+        "{language_instruction}", LANGUAGE_INSTRUCTIONS[language]
+    )
+    system_message = (
+        _SYSTEM_MESSAGE_CACHE_CONTROL if settings.LLM_PROMPT_CACHE_CONTROL else _SYSTEM_MESSAGE
+    )
 
-        meta_line = " | ".join(meta_parts) if meta_parts else "Unknown source"
-        text = chunk.get("text", "")
-        parts.append(f"[Source {i}] ({meta_line})\n{text}")
+    def build(user_query: str, context_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        user_content = template.format(
+            context=_format_context(context_chunks),
+            query=user_query,
+        )
+        return [system_message, {"role": "user", "content": user_content}]
 
-    return "\n\n---\n\n".join(parts)
+    build.__name__ = f"build_messages_{language}"
+    return build
+
+
+_MESSAGE_BUILDERS: Dict[str, MessageBuilder] = {
+    language: _make_message_builder(language) for language in LANGUAGE_INSTRUCTIONS
+}
+build_messages_en = _MESSAGE_BUILDERS["en"]
+build_messages_hi = _MESSAGE_BUILDERS["hi"]
 
 
 def build_messages(
     user_query: str,
     context_chunks: List[Dict[str, Any]],
     language: str = "en",
-) -> List[Dict[str, str]]:
+) -> List[Dict[str, Any]]:
     """
     Construct the messages array for the OpenRouter chat completions API.
 
     Args:
         user_query:     The user's legal question.
         context_chunks: List of dicts with keys: text, law, section, source, category.
-        language:       "en" or "hi".
+        language:       "en" or "hi" (anything else falls back to English).
 
     Returns:
-        List of message dicts with 'role' and 'content' keys.
+        List of message dicts with 'role' and 'content' keys. The system
+        message is a shared prebuilt dict and must not be mutated.
     """
-    context_str = _format_context(context_chunks)
-    lang_instruction = LANGUAGE_INSTRUCTIONS.get(language, LANGUAGE_INSTRUCTIONS["en"])
-
-    user_content = USER_PROMPT_TEMPLATE.format(
-        context=context_str,
-        query=user_query,
-        language_instruction=lang_instruction,
-    )
-
-    return [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_content},
-    ]
+    builder = _MESSAGE_BUILDERS.get(language, build_messages_en)
+    return builder(user_query, context_chunks)
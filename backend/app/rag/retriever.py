@@ -7,15 +7,85 @@ to retrieve top-k relevant legal chunks for a given query.
 
 from __future__ import annotations
 
+import asyncio
+import ctypes
+import os
 import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import faiss
 import numpy as np
+import pyarrow.parquet as pq
 from loguru import logger
 
 from app.config import settings
+from app.rag.batcher import AsyncBatcher
+
+# Per-chunk metadata columns stored alongside the chunk text.
+METADATA_FIELDS = ("law", "section", "source", "category")
+PREVIEW_CHARS = 300
+
+
+def make_preview(text: str) -> str:
+    """Truncated excerpt of a chunk shown as a source in API responses."""
+    return text[:PREVIEW_CHARS] + "..." if len(text) > PREVIEW_CHARS else text
+
+
+def _resident_bytes() -> int:
+    """Current resident set size of this process (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _advise_willneed(path: Path) -> None:
+    """Ask the kernel to start reading the file into the page cache."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError as exc:
+        logger.debug("posix_fadvise failed for {path}: {err}", path=path, err=exc)
+
+
+def _lock_memory() -> None:
+    """Pin the process's current pages in RAM via mlockall(MCL_CURRENT)."""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.mlockall(1) != 0:  # MCL_CURRENT
+            err = ctypes.get_errno()
+            logger.warning("mlockall failed: {err}", err=os.strerror(err))
+        else:
+            logger.info("Process memory locked in RAM.")
+    except (OSError, AttributeError) as exc:
+        logger.warning("mlockall is not available: {err}", err=exc)
+
+
+def apply_search_params(index: faiss.Index) -> None:
+    """Apply query-time tuning knobs for approximate index types."""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = settings.FAISS_NPROBE
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+
+
+def _load_legacy_columns(idx_dir: Path) -> Dict[str, List[str]]:
+    """Convert the pickled texts.npy / metadatas.npy pair into per-field columns."""
+    texts = np.load(str(idx_dir / "texts.npy"), allow_pickle=True)
+    metadatas = np.load(str(idx_dir / "metadatas.npy"), allow_pickle=True)
+
+    columns: Dict[str, List[str]] = {"text": [str(t) for t in texts]}
+    columns["text_preview"] = [make_preview(t) for t in columns["text"]]
+    for field in METADATA_FIELDS:
+        columns[field] = [m.get(field, "") if isinstance(m, dict) else "" for m in metadatas]
+    return columns
 
 
 class Retriever:
@@ -33,9 +103,9 @@ class Retriever:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
                     cls._instance._index = None
-                    cls._instance._texts = None
-                    cls._instance._metadatas = None
+                    cls._instance._columns = None
                     cls._instance._loaded = False
+                    cls._instance._batcher = None
         return cls._instance
 
     @property
@@ -47,14 +117,14 @@ class Retriever:
         Load the FAISS index and associated data from disk.
 
         Args:
-            index_path: Directory containing index.faiss, texts.npy, metadatas.npy.
+            index_path: Directory containing index.faiss and metadatas.parquet
+                        (or the legacy texts.npy / metadatas.npy pair).
         """
         index_path = index_path or settings.FAISS_INDEX_PATH
         idx_dir = Path(index_path)
 
         index_file = idx_dir / "index.faiss"
-        texts_file = idx_dir / "texts.npy"
-        metadatas_file = idx_dir / "metadatas.npy"
+        metadatas_file = idx_dir / "metadatas.parquet"
 
         if not index_file.exists():
             logger.warning(
@@ -64,15 +134,93 @@ class Retriever:
             )
             return
 
+        rss_before = _resident_bytes()
+        _advise_willneed(index_file)
+
         self._index = faiss.read_index(str(index_file))
-        self._texts = np.load(str(texts_file), allow_pickle=True)
-        self._metadatas = np.load(str(metadatas_file), allow_pickle=True)
+        apply_search_params(self._index)
+        if metadatas_file.exists():
+            self._columns = pq.read_table(str(metadatas_file)).to_pydict()
+            if "text_preview" not in self._columns:
+                self._columns["text_preview"] = [make_preview(t) for t in self._columns["text"]]
+        else:
+            self._columns = _load_legacy_columns(idx_dir)
         self._loaded = True
 
+        # Touch the index pages now so the first real query doesn't pay for them.
+        if self._index.ntotal:
+            self._index.search(np.zeros((1, self._index.d), dtype="float32"), 1)
+        if settings.FAISS_MLOCK:
+            _lock_memory()
+
         logger.info(
-            "FAISS index loaded: {n} vectors",
+            "FAISS index loaded: {n} vectors (resident set +{mb:.1f} MB)",
             n=self._index.ntotal,
+            mb=(_resident_bytes() - rss_before) / (1024 * 1024),
+        )
+
+    def _ensure_loaded(self) -> bool:
+        """Load the index on demand; return False if it is still unavailable."""
+        if not self._loaded or self._index is None:
+            logger.warning("Index not loaded. Attempting to load now...")
+            self.load_index()
+            if not self._loaded:
+                logger.error("Failed to load index. Returning empty results.")
+                return False
+        return True
+
+    def _build_results(self, distances: np.ndarray, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """Attach chunk text and metadata to one row of FAISS search output."""
+        columns = self._columns
+        texts, previews = columns["text"], columns["text_preview"]
+        laws, sections = columns["law"], columns["section"]
+        sources, categories = columns["source"], columns["category"]
+
+        results = []
+        for dist, idx in zip(distances, indices):
+            if idx == -1:  # FAISS returns -1 for empty slots
+                continue
+            results.append(
+                {
+                    "id": int(idx),
+                    "text": texts[idx],
+                    "text_preview": previews[idx],
+                    "law": laws[idx],
+                    "section": sections[idx],
+                    "source": sources[idx],
+                    "category": categories[idx],
+                    "score": float(dist),
+                }
+            )
+        return results
+
+    def _retrieve_batch(self, requests: List[Tuple[str, int]]) -> List[List[Dict[str, Any]]]:
+        """
+        Embed and search a batch of (query, top_k) requests at once.
+
+        All queries go through a single embedding forward pass and a single
+        `index.search` over the stacked (B, D) matrix, searched at the largest
+        requested k; each row is then trimmed to its own top_k. The encoder
+        already returns a contiguous float32 matrix, which FAISS reads in
+        place without any staging copy.
+        """
+        # Lazy import avoids loading torch/sentence-transformers at app startup.
+        from app.services.embedding_service import embedding_service
+
+        query_matrix = embedding_service.embed_batch([query for query, _ in requests])
+        max_k = min(max(k for _, k in requests), self._index.ntotal)
+        distances, indices = self._index.search(query_matrix, max_k)
+
+        batch_results = [
+            self._build_results(distances[b, :k], indices[b, :k])
+            for b, (_, k) in enumerate(requests)
+        ]
+        logger.debug(
+            "Retrieved chunks for {n} batched queries (max top_k={k})",
+            n=len(requests),
+            k=max_k,
         )
+        return batch_results
 
     def retrieve(
         self,
@@ -88,55 +236,97 @@ class Retriever:
 
         Returns:
             List of dicts, each containing:
+                - id:       Row of the chunk in the index
                 - text:     The chunk text
+                - text_preview: First 300 chars of the text, for display
                 - law:      Associated law/act name
                 - section:  Section identifier
                 - source:   Source PDF filename
                 - category: Legal category
                 - score:    Similarity score (lower L2 distance = more similar)
         """
-        if not self._loaded or self._index is None:
-            logger.warning("Index not loaded. Attempting to load now...")
-            self.load_index()
-            if not self._loaded:
-                logger.error("Failed to load index. Returning empty results.")
-                return []
+        if not self._ensure_loaded():
+            return []
 
         top_k = top_k or settings.TOP_K
 
         # Lazy import avoids loading torch/sentence-transformers at app startup.
         from app.services.embedding_service import embedding_service
 
-        # Embed the query
-        query_embedding = embedding_service.embed_query(query)
-        query_vector = np.array([query_embedding], dtype="float32")
+        # Embed the query; (dim,) float32 -> (1, dim) view, no copy
+        query_vector = embedding_service.embed_query(query).reshape(1, -1)
 
         # Search FAISS
         distances, indices = self._index.search(query_vector, min(top_k, self._index.ntotal))
+        results = self._build_results(distances[0], indices[0])
 
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx == -1:  # FAISS returns -1 for empty slots
-                continue
-            meta = self._metadatas[idx] if isinstance(self._metadatas[idx], dict) else {}
-            results.append(
-                {
-                    "text": str(self._texts[idx]),
-                    "law": meta.get("law", ""),
-                    "section": meta.get("section", ""),
-                    "source": meta.get("source", ""),
-                    "category": meta.get("category", ""),
-                    "score": float(dist),
-                }
-            )
-
-        logger.info(
+        logger.debug(
             "Retrieved {n} chunks for query (top_k={k})",
             n=len(results),
             k=top_k,
         )
         return results
 
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        top_k: int | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve the top-k chunks for several queries with one embedding pass
+        and one FAISS search.
+
+        Args:
+            queries: Search queries.
+            top_k:   Number of chunks per query (defaults to settings.TOP_K).
+
+        Returns:
+            One result list per query, in input order, each shaped as in
+            `retrieve`.
+        """
+        if not queries or not self._ensure_loaded():
+            return [[] for _ in queries]
+
+        top_k = top_k or settings.TOP_K
+        return self._retrieve_batch([(query, top_k) for query in queries])
+
+    async def aretrieve(
+        self,
+        query: str,
+        top_k: int | None = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of `retrieve` for request handlers.
+
+        Concurrent queries are coalesced by a micro-batcher into one embedding
+        forward pass and one FAISS search. Batching is disabled when
+        settings.FAISS_BATCH_WINDOW_MS is 0, in which case the query is
+        retrieved on its own in a worker thread.
+        """
+        if not self._ensure_loaded():
+            return []
+
+        top_k = top_k or settings.TOP_K
+
+        if settings.FAISS_BATCH_WINDOW_MS <= 0:
+            return await asyncio.to_thread(self.retrieve, query, top_k)
+
+        return await self._get_batcher().submit((query, top_k))
+
+    def _get_batcher(self) -> AsyncBatcher:
+        if self._batcher is None:
+            self._batcher = AsyncBatcher(
+                self._retrieve_batch,
+                window_ms=settings.FAISS_BATCH_WINDOW_MS,
+                max_batch=settings.FAISS_BATCH_MAX,
+            )
+        return self._batcher
+
+    async def close(self) -> None:
+        """Stop the background batching task."""
+        if self._batcher is not None:
+            await self._batcher.close()
+
 
 # ── Module-level convenience instance ────────────────────────────────────
 retriever = Retriever()
@@ -3,18 +3,30 @@ NyayaAI – Embedding Service
 =============================
 Singleton wrapper around a sentence-transformer model for generating embeddings.
 Uses all-MiniLM-L6-v2 (384-dimensional, fast, free).
+
+Two backends are supported (settings.EMBEDDING_BACKEND):
+    torch – the SentenceTransformer model in FP32 (default).
+    onnx  – an int8-quantized ONNX export run with onnxruntime on CPU.
+            Create it once with: python -m app.services.onnx_export
 """
 
 from __future__ import annotations
 
 import threading
-from typing import List
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List
 
+import numpy as np
 from loguru import logger
-from sentence_transformers import SentenceTransformer
 
 from app.config import settings
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# Matches SentenceTransformer's max_seq_length for all-MiniLM-L6-v2.
+_ONNX_MAX_SEQ_LENGTH = 256
+
 
 class EmbeddingService:
     """
@@ -31,12 +43,16 @@ class EmbeddingService:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
                     cls._instance._model = None
+                    cls._instance._onnx_session = None
+                    cls._instance._onnx_tokenizer = None
         return cls._instance
 
     @property
     def model(self) -> SentenceTransformer:
         """Lazy-load the embedding model on first access."""
         if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
             logger.info(
                 "Loading embedding model: {model}", model=settings.EMBEDDING_MODEL
             )
@@ -44,6 +60,71 @@ class EmbeddingService:
             logger.info("Embedding model loaded successfully.")
         return self._model
 
+    def _load_onnx(self) -> None:
+        """Lazy-load the quantized ONNX session and its tokenizer."""
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(settings.EMBEDDING_ONNX_PATH)
+        logger.info("Loading ONNX embedding model from {path}", path=model_dir)
+
+        sess_options = ort.SessionOptions()
+        sess_options.intra_op_num_threads = settings.EMBEDDING_THREADS
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self._onnx_tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self._onnx_session = ort.InferenceSession(
+            str(model_dir / "model_quantized.onnx"),
+            sess_options,
+            providers=["CPUExecutionProvider"],
+        )
+        logger.info("ONNX embedding model loaded successfully.")
+
+    def _encode_onnx(self, texts: List[str]) -> np.ndarray:
+        """Mean-pooled, L2-normalised embeddings from the ONNX session."""
+        if self._onnx_session is None:
+            self._load_onnx()
+
+        tokens = self._onnx_tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=_ONNX_MAX_SEQ_LENGTH,
+            return_tensors="np",
+        )
+        feeds: dict[str, Any] = {
+            inp.name: tokens[inp.name].astype(np.int64)
+            for inp in self._onnx_session.get_inputs()
+            if inp.name in tokens
+        }
+        token_embeddings = self._onnx_session.run(None, feeds)[0]
+
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype("float32", copy=False)
+
+    def _encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embed texts with the configured backend as a float32 (N, dim) array."""
+        if settings.EMBEDDING_BACKEND == "onnx":
+            return np.vstack(
+                [
+                    self._encode_onnx(texts[i : i + batch_size])
+                    for i in range(0, len(texts), batch_size)
+                ]
+            )
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype("float32", copy=False)
+
+    def warmup(self) -> None:
+        """Load the model and run one inference so kernels are initialised."""
+        self._encode(["warmup"])
+
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for a batch of texts.
@@ -56,15 +137,21 @@ class EmbeddingService:
         """
         if not texts:
             return []
-        embeddings = self.model.encode(
-            texts,
-            show_progress_bar=False,
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-        )
-        return embeddings.tolist()
+        return self._encode(texts).tolist()
+
+    def embed_batch(self, queries: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for a batch of queries in a single forward pass.
+
+        Args:
+            queries: Query strings collected from concurrent requests.
+
+        Returns:
+            float32 array of shape (len(queries), dim).
+        """
+        return self._encode(queries, batch_size=max(1, len(queries)))
 
-    def embed_query(self, query: str) -> List[float]:
+    def embed_query(self, query: str) -> np.ndarray:
         """
         Generate an embedding for a single query string.
 
@@ -72,9 +159,9 @@ class EmbeddingService:
             query: The query text to embed.
 
         Returns:
-            A single embedding vector as a list of floats.
+            float32 array of shape (dim,).
         """
-        return self.embed_texts([query])[0]
+        return self._encode([query])[0]
 
 
 # ── Module-level convenience instance ────────────────────────────────────
@@ -7,15 +7,83 @@ Handles request construction, response parsing, and structured output.
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import io
 import json
 import re
-from typing import Any, AsyncGenerator, Dict, List, Optional
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 from loguru import logger
 
 from app.config import settings
 from app.rag.prompts import build_messages
+from app.services.semantic_cache import embed_cache_query, semantic_cache
+from app.utils.response_cache import TTLCache
+
+
+# ══════════════════════════════════════════════════════════════════════════
+# HTTP CLIENT
+# ══════════════════════════════════════════════════════════════════════════
+
+# One pooled client per process: connections (and their TLS sessions) are
+# reused across requests and concurrent calls multiplex over HTTP/2.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared OpenRouter client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            headers={
+                "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://nyayaai.vercel.app",
+                "X-Title": "NyayaAI Legal Assistant",
+            },
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            # Fail fast on an unreachable endpoint instead of waiting out the
+            # full read timeout before falling back to the next model.
+            timeout=httpx.Timeout(settings.OPENROUTER_TIMEOUT_SECONDS, connect=5.0),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# Plain-string fields of the response schema (next_steps is the list field).
+_TEXT_FIELDS = ("summary", "relevant_law", "your_rights", "disclaimer")
+
+_DEFAULT_DISCLAIMER = (
+    "This is informational only and does not constitute legal advice. "
+    "Please consult a qualified lawyer for your specific situation."
+)
+
+# Parsed responses from call_llm, keyed by _llm_cache_key.
+_llm_cache = TTLCache(maxsize=settings.LLM_CACHE_MAXSIZE, ttl=settings.LLM_CACHE_TTL_SECONDS)
+
+# Patterns applied to every LLM response, compiled once.
+_FENCE_LEAD = re.compile(r"^```(?:json)?\s*\n?")
+_FENCE_TRAIL = re.compile(r"\n?\s*```\s*$")
+_SUMMARY_EXTRACT = re.compile(r'"summary"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_SUMMARY_KEY = re.compile(r'"summary"\s*:\s*"')
+_PREAMBLE = re.compile(r"^[^\{]*(?=\{)")
+_NEWLINES = re.compile(r"\n+")
+_STEP_PREFIX = re.compile(r"^(?:Step\s*)?\d+[\.\):\-]\s*", re.IGNORECASE)
+_MD_BOLD_STAR = re.compile(r"\*\*(.+?)\*\*")
+_MD_BOLD_UND = re.compile(r"__(.+?)__")
+_MD_IT_STAR = re.compile(r"(?<!\w)\*([^*]+?)\*(?!\w)")
+_MD_IT_UND = re.compile(r"(?<!\w)_([^_]+?)_(?!\w)")
 
 
 # ══════════════════════════════════════════════════════════════════════════
@@ -49,40 +117,105 @@ async def call_llm(
     """
     Send a prompt to the OpenRouter LLM and return a structured legal response.
 
+    The completion is streamed and the stream is closed as soon as a
+    complete JSON object has been received.
+
+    Responses are cached per (models, language, normalised query, context
+    chunk ids), so repeats skip the OpenRouter round-trip entirely. With
+    LLM_SEMANTIC_CACHE_ENABLED, close paraphrases of a cached query in the
+    same language are answered from the cache as well.
+
     Returns:
         Parsed dict with keys: summary, relevant_law, your_rights,
         next_steps, disclaimer.  Every value is guaranteed to be either
         a plain string or a list of strings.
     """
 
-    messages = build_messages(user_query, context_chunks, language)
     model_candidates = _build_model_candidates()
-    payload = _build_payload(messages=messages, model_candidates=model_candidates)
+    cache_key = _llm_cache_key(model_candidates, language, user_query, context_chunks)
+    cached = _llm_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("LLM cache hit.")
+        return {**cached, "next_steps": list(cached["next_steps"])}
+
+    query_embedding = None
+    semantic_scope = (tuple(model_candidates), language)
+    if settings.LLM_SEMANTIC_CACHE_ENABLED:
+        query_embedding = await asyncio.to_thread(
+            embed_cache_query, user_query.strip().lower()
+        )
+        cached = semantic_cache.lookup(semantic_scope, query_embedding)
+        if cached is not None:
+            logger.debug("LLM semantic cache hit.")
+            return {**cached, "next_steps": list(cached["next_steps"])}
 
-    headers = {
-        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://nyayaai.vercel.app",
-        "X-Title": "NyayaAI Legal Assistant",
-    }
+    messages = build_messages(user_query, context_chunks, language)
+    payload = _build_payload(messages=messages, model_candidates=model_candidates, stream=True)
 
-    logger.info("Calling OpenRouter models (priority): {models}", models=model_candidates)
+    logger.debug("Calling OpenRouter models (priority): {models}", models=model_candidates)
 
-    async with httpx.AsyncClient(timeout=settings.OPENROUTER_TIMEOUT_SECONDS) as client:
-        response = await client.post(
-            settings.OPENROUTER_BASE_URL,
-            json=payload,
-            headers=headers,
-        )
-        response.raise_for_status()
+    # Stream the completion and stop as soon as a complete top-level JSON
+    # object has arrived, rather than waiting for (and paying for) any
+    # trailing commentary the model adds after it.
+    parts: List[str] = []
+    tracker = _JsonObjectTracker()
+    complete = False
+    tokens = _iter_stream_tokens(payload)
+    try:
+        async for token in tokens:
+            parts.append(token)
+            for start, end in tracker.feed(token):
+                buffered = "".join(parts)
+                if _is_json_object(buffered[start:end]):
+                    parts = [buffered[:end]]
+                    complete = True
+                    break
+            if complete:
+                logger.debug("Complete JSON object received; closing LLM stream early.")
+                break
+    finally:
+        await tokens.aclose()
+
+    raw_content = "".join(parts)
+    if not raw_content:
+        # The buffered API failed loudly here; don't turn it into a blank answer.
+        raise RuntimeError("OpenRouter returned an empty completion")
+
+    # Lazy: the length and the 500-char slice are only computed when DEBUG
+    # is actually enabled.
+    logger.opt(lazy=True).debug(
+        "Raw LLM response length: {n} chars", n=lambda: len(raw_content)
+    )
+    logger.opt(lazy=True).debug(
+        "Raw LLM content (first 500): {c}", c=lambda: raw_content[:500]
+    )
 
-    data = response.json()
-    raw_content = data["choices"][0]["message"]["content"]
+    parsed = _parse_llm_content(raw_content)
+    # Don't pin raw-text fallbacks (unparseable output) in the cache.
+    if parsed.get("relevant_law") or parsed.get("next_steps"):
+        _llm_cache.set(cache_key, parsed)
+        if query_embedding is not None:
+            semantic_cache.add(semantic_scope, query_embedding, parsed)
+    return {**parsed, "next_steps": list(parsed["next_steps"])}
 
-    logger.debug("Raw LLM response length: {n} chars", n=len(raw_content))
-    logger.debug("Raw LLM content (first 500): {c}", c=raw_content[:500])
 
-    return _parse_llm_content(raw_content)
+def _llm_cache_key(
+    model_candidates: List[str],
+    language: str,
+    user_query: str,
+    context_chunks: List[Dict[str, Any]],
+) -> str:
+    """Hash everything that determines the LLM's answer into a cache key."""
+    key_data = {
+        "m": model_candidates,
+        "lang": language,
+        "q": user_query.strip().lower(),
+        "ctx": [c.get("id", c.get("source")) for c in context_chunks],
+    }
+    return hashlib.blake2b(
+        json.dumps(key_data, sort_keys=True, ensure_ascii=False).encode("utf-8"),
+        digest_size=16,
+    ).hexdigest()
 
 
 async def stream_llm_events(
@@ -105,64 +238,148 @@ async def stream_llm_events(
         stream=True,
     )
 
-    headers = {
-        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://nyayaai.vercel.app",
-        "X-Title": "NyayaAI Legal Assistant",
-    }
-
-    logger.info("Streaming OpenRouter models (priority): {models}", models=model_candidates)
+    logger.debug("Streaming OpenRouter models (priority): {models}", models=model_candidates)
 
     accumulated_parts: List[str] = []
     emitted_summary_len = 0
 
-    async with httpx.AsyncClient(timeout=settings.OPENROUTER_TIMEOUT_SECONDS) as client:
-        async with client.stream(
-            "POST",
-            settings.OPENROUTER_BASE_URL,
-            json=payload,
-            headers=headers,
-        ) as response:
-            response.raise_for_status()
-
-            async for line in response.aiter_lines():
-                if not line:
-                    continue
-                if not line.startswith("data:"):
-                    continue
-
-                data_str = line[5:].strip()
-                if not data_str:
-                    continue
-                if data_str == "[DONE]":
+    async for token in _iter_stream_tokens(payload):
+        accumulated_parts.append(token)
+        summary_partial = _extract_partial_summary("".join(accumulated_parts))
+        if len(summary_partial) > emitted_summary_len:
+            delta_text = summary_partial[emitted_summary_len:]
+            emitted_summary_len = len(summary_partial)
+            yield {"type": "token", "token": delta_text}
+
+    raw_content = "".join(accumulated_parts)
+    logger.opt(lazy=True).debug(
+        "Raw streamed LLM response length: {n} chars", n=lambda: len(raw_content)
+    )
+    parsed = _parse_llm_content(raw_content)
+    yield {"type": "done", "response": parsed}
+
+
+async def _iter_stream_tokens(payload: Dict[str, Any]) -> AsyncGenerator[str, None]:
+    """
+    POST a streaming payload and yield content tokens from the SSE events.
+    Reading stops once more than LLM_MAX_RESPONSE_CHARS have been received.
+    """
+    received = 0
+    async with get_client().stream(
+        "POST",
+        settings.OPENROUTER_BASE_URL,
+        json=payload,
+    ) as response:
+        response.raise_for_status()
+
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            if not line.startswith("data:"):
+                continue
+
+            data_str = line[5:].strip()
+            if not data_str:
+                continue
+            if data_str == "[DONE]":
+                break
+
+            try:
+                chunk = orjson.loads(data_str)
+            except orjson.JSONDecodeError:
+                continue
+
+            # Mid-stream failures arrive as an SSE event, after the 200 status.
+            error = chunk.get("error")
+            if error:
+                message = error.get("message", error) if isinstance(error, dict) else error
+                raise RuntimeError(f"OpenRouter stream error: {message}")
+
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+
+            choice = choices[0] if isinstance(choices[0], dict) else {}
+            delta = choice.get("delta") or {}
+
+            token = delta.get("content") if isinstance(delta, dict) else None
+            if token:
+                yield token
+                received += len(token)
+                if received > settings.LLM_MAX_RESPONSE_CHARS:
+                    logger.warning(
+                        "LLM stream exceeded {n} chars; closing it.",
+                        n=settings.LLM_MAX_RESPONSE_CHARS,
+                    )
                     break
 
-                try:
-                    chunk = json.loads(data_str)
-                except json.JSONDecodeError:
-                    continue
 
-                choices = chunk.get("choices") or []
-                if not choices:
-                    continue
+def _is_json_object(candidate: str) -> bool:
+    try:
+        return isinstance(orjson.loads(candidate), dict)
+    except orjson.JSONDecodeError:
+        return False
 
-                choice = choices[0] if isinstance(choices[0], dict) else {}
-                delta = choice.get("delta") or {}
 
-                token = delta.get("content") if isinstance(delta, dict) else None
-                if token:
-                    accumulated_parts.append(token)
-                    summary_partial = _extract_partial_summary("".join(accumulated_parts))
-                    if len(summary_partial) > emitted_summary_len:
-                        delta_text = summary_partial[emitted_summary_len:]
-                        emitted_summary_len = len(summary_partial)
-                        yield {"type": "token", "token": delta_text}
+class _JsonObjectTracker:
+    """
+    Tracks brace depth across streamed chunks to report, in absolute
+    offsets, each span where a top-level JSON object opens and closes.
+    Uses the same string/escape rules as `_parse_balanced_json`.
+    """
 
-    raw_content = "".join(accumulated_parts)
-    logger.debug("Raw streamed LLM response length: {n} chars", n=len(raw_content))
-    parsed = _parse_llm_content(raw_content)
-    yield {"type": "done", "response": parsed}
+    def __init__(self) -> None:
+        self._offset = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = -1
+
+    def feed(self, chunk: str) -> List[Tuple[int, int]]:
+        """Consume the next chunk; return (start, end) spans closed within it."""
+        closed: List[Tuple[int, int]] = []
+        pos = 0
+        if self._escape:
+            self._escape = False
+            pos = 1
+
+        while True:
+            if self._in_string:
+                match = _STRING_STRUCTURAL.search(chunk, pos)
+            elif self._depth:
+                match = _STRUCTURAL.search(chunk, pos)
+            else:
+                # Outside any object only an opening brace matters.
+                i = chunk.find("{", pos)
+                if i == -1:
+                    break
+                self._start = self._offset + i
+                self._depth = 1
+                pos = i + 1
+                continue
+            if match is None:
+                break
+
+            i = match.start()
+            ch = chunk[i]
+            if ch == "\\":
+                if i + 1 >= len(chunk):
+                    self._escape = True
+                    break
+                pos = i + 2
+                continue
+            pos = i + 1
+            if ch == '"':
+                self._in_string = not self._in_string
+            elif ch == "{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    closed.append((self._start, self._offset + pos))
+
+        self._offset += len(chunk)
+        return closed
 
 
 def _build_payload(
@@ -181,6 +398,11 @@ def _build_payload(
     if stream:
         payload["stream"] = True
 
+    # Ask the provider for strictly valid JSON; the system prompt already
+    # mentions JSON, which some providers require alongside this flag.
+    if settings.LLM_JSON_MODE:
+        payload["response_format"] = {"type": "json_object"}
+
     if len(model_candidates) > 1:
         payload["models"] = model_candidates
         payload["route"] = "fallback"
@@ -195,12 +417,49 @@ def _build_payload(
 def _parse_llm_content(raw_content: str) -> Dict[str, Any]:
     """Parse model output into the structured response schema."""
 
+    # Oversized output skips the repair chain, whose passes each rescan the
+    # whole text, and goes straight to the raw-text fallback.
+    budget = settings.LLM_MAX_RESPONSE_CHARS
+    if len(raw_content) > budget:
+        logger.warning(
+            "LLM response too large ({n} chars); using raw text as summary.",
+            n=len(raw_content),
+        )
+        parsed = _fallback_response(raw_content[:budget])
+    else:
+        parsed = _parse_structured(raw_content)
+        if parsed is None:
+            logger.warning("Could not parse structured JSON; using raw text as summary.")
+            parsed = _fallback_response(raw_content)
+
+    # ── Normalise all fields to plain strings / list[str] ────────────
+    parsed = _normalise_fields(parsed)
+
+    # Ensure disclaimer
+    if not parsed.get("disclaimer"):
+        parsed["disclaimer"] = _DEFAULT_DISCLAIMER
+
+    return parsed
+
+
+def _parse_structured(raw_content: str) -> Optional[Dict[str, Any]]:
+    """Run the JSON extraction and repair chain; None if nothing parses."""
+
     # ── Parse structured JSON from model output ──────────────────────
-    parsed = _extract_json(raw_content)
+    # Fast path: the output is exactly one JSON object (the usual case in
+    # JSON mode), so one C-level decode replaces the fence/brace scanning.
+    try:
+        parsed = orjson.loads(raw_content)
+    except orjson.JSONDecodeError:
+        parsed = None
+    if isinstance(parsed, dict):
+        parsed = _unwrap_fields(parsed)
+    else:
+        parsed = _extract_json(raw_content)
 
     # If first attempt failed, try stripping LLM preamble text
     if parsed is None:
-        stripped = re.sub(r"^[^\{]*(?=\{)", "", raw_content, count=1).strip()
+        stripped = _PREAMBLE.sub("", raw_content, count=1).strip()
         if stripped.startswith("{"):
             parsed = _extract_json(stripped)
 
@@ -229,36 +488,23 @@ def _parse_llm_content(raw_content: str) -> Dict[str, Any]:
                     if isinstance(inner_sum, str) and not inner_sum.strip().startswith("{"):
                         parsed = inner
 
-    # ── Final fallback: use raw text as summary ──────────────────────
-    if parsed is None:
-        logger.warning("Could not parse structured JSON; using raw text as summary.")
-        parsed = {
-            "summary": _clean_raw_text(raw_content),
-            "relevant_law": "",
-            "your_rights": "",
-            "next_steps": [],
-            "disclaimer": (
-                "This is informational only and does not constitute legal advice. "
-                "Please consult a qualified lawyer for your specific situation."
-            ),
-        }
+    return parsed
 
-    # ── Normalise all fields to plain strings / list[str] ────────────
-    parsed = _normalise_fields(parsed)
 
-    # Ensure disclaimer
-    if not parsed.get("disclaimer"):
-        parsed["disclaimer"] = (
-            "This is informational only and does not constitute legal advice. "
-            "Please consult a qualified lawyer for your specific situation."
-        )
-
-    return parsed
+def _fallback_response(raw_content: str) -> Dict[str, Any]:
+    """Use the (cleaned) raw model text as the summary."""
+    return {
+        "summary": _clean_raw_text(raw_content),
+        "relevant_law": "",
+        "your_rights": "",
+        "next_steps": [],
+        "disclaimer": _DEFAULT_DISCLAIMER,
+    }
 
 
 def _extract_partial_summary(raw_content: str) -> str:
     """Best-effort incremental extractor for the JSON `summary` field."""
-    match = re.search(r'"summary"\s*:\s*"', raw_content)
+    match = _SUMMARY_KEY.search(raw_content)
     if not match:
         return ""
 
@@ -307,7 +553,25 @@ def _normalise_fields(parsed: Dict[str, Any]) -> Dict[str, Any]:
     - next_steps → List[str]
     Flatten nested objects/arrays into readable strings.
     """
-    for key in ("summary", "relevant_law", "your_rights", "disclaimer"):
+    # Fast path: the model followed the schema (string fields and a list
+    # of string steps), so there is nothing to flatten.
+    ns = parsed.get("next_steps", [])
+    if (
+        isinstance(ns, list)
+        and all(isinstance(parsed.get(key, ""), str) for key in _TEXT_FIELDS)
+        and all(isinstance(item, str) for item in ns)
+    ):
+        for key in _TEXT_FIELDS:
+            parsed[key] = _strip_markdown(parsed.get(key, "").strip())
+        clean_steps = []
+        for item in ns:
+            step = _STEP_PREFIX.sub("", _strip_markdown(item.strip()))
+            if step:
+                clean_steps.append(step)
+        parsed["next_steps"] = clean_steps
+        return parsed
+
+    for key in _TEXT_FIELDS:
         val = parsed.get(key, "")
         parsed[key] = _flatten_to_string(val)
         # Strip any leftover markdown formatting
@@ -318,7 +582,7 @@ def _normalise_fields(parsed: Dict[str, Any]) -> Dict[str, Any]:
     if isinstance(ns, str):
         # Split string into list
         parsed["next_steps"] = [
-            _strip_markdown(s.strip()) for s in re.split(r"\n+", ns) if s.strip()
+            _strip_markdown(s.strip()) for s in _NEWLINES.split(ns) if s.strip()
         ]
     elif isinstance(ns, list):
         clean_steps = []
@@ -326,7 +590,7 @@ def _normalise_fields(parsed: Dict[str, Any]) -> Dict[str, Any]:
             s = _flatten_to_string(item)
             s = _strip_markdown(s.strip())
             # Remove leading numbering like "1. " or "Step 1: "
-            s = re.sub(r"^(?:Step\s*)?\d+[\.\):\-]\s*", "", s, flags=re.IGNORECASE)
+            s = _STEP_PREFIX.sub("", s)
             if s:
                 clean_steps.append(s)
         parsed["next_steps"] = clean_steps
@@ -342,46 +606,76 @@ def _flatten_to_string(val: Any) -> str:
         return ""
     if isinstance(val, str):
         return val.strip()
-    if isinstance(val, list):
-        parts = []
-        for item in val:
-            if isinstance(item, dict):
-                # e.g. {"act": "Consumer Protection Act", "sections": [...]}
-                readable = _dict_to_readable(item)
-                if readable:
-                    parts.append(readable)
-            elif isinstance(item, str):
-                parts.append(item.strip())
-            else:
-                parts.append(str(item))
-        return "; ".join(parts) if parts else ""
     if isinstance(val, dict):
         return _dict_to_readable(val)
-    return str(val)
+    if not isinstance(val, list):
+        return str(val)
+
+    # Every item is written into one buffer; separators are emitted lazily
+    # so dicts with nothing readable are skipped without a stray "; ".
+    buf = io.StringIO()
+    write = buf.write
+    first = True
+    for item in val:
+        if isinstance(item, dict):
+            # e.g. {"act": "Consumer Protection Act", "sections": [...]}
+            if _write_readable(write, item, "" if first else "; "):
+                first = False
+            continue
+        if not first:
+            write("; ")
+        write(item.strip() if isinstance(item, str) else str(item))
+        first = False
+    return buf.getvalue()
 
 
 def _dict_to_readable(d: Dict[str, Any]) -> str:
     """Convert a dict like {"act": "...", "sections": [...]} to readable text."""
-    parts = []
+    buf = io.StringIO()
+    _write_readable(buf.write, d, "")
+    return buf.getvalue()
+
+
+def _write_readable(write: Callable[[str], Any], d: Dict[str, Any], lead: str) -> bool:
+    """
+    Write "key: value" parts of `d` joined by ". ", preceded by `lead`.
+    Nothing (not even `lead`) is written if no part is readable.
+    Returns whether anything was written.
+    """
+    wrote = False
     for key, value in d.items():
+        if not isinstance(value, (list, dict)) and not value:
+            continue
+        write(". " if wrote else lead)
+        write(str(key))
+        write(": ")
         if isinstance(value, list):
-            joined = ", ".join(str(v) for v in value)
-            parts.append(f"{key}: {joined}")
+            for i, v in enumerate(value):
+                if i:
+                    write(", ")
+                write(str(v))
         elif isinstance(value, dict):
-            parts.append(f"{key}: {json.dumps(value, ensure_ascii=False)}")
-        elif value:
-            parts.append(f"{key}: {value}")
-    return ". ".join(parts) if parts else ""
+            write(json.dumps(value, ensure_ascii=False))
+        else:
+            write(str(value))
+        wrote = True
+    return wrote
 
 
 def _strip_markdown(text: str) -> str:
     """Remove markdown bold/italic markers from text."""
     if not text:
         return ""
-    text = re.sub(r"\*\*(.+?)\*\*", r"\1", text)
-    text = re.sub(r"__(.+?)__", r"\1", text)
-    text = re.sub(r"(?<!\w)\*([^*]+?)\*(?!\w)", r"\1", text)
-    text = re.sub(r"(?<!\w)_([^_]+?)_(?!\w)", r"\1", text)
+    # Each pass only runs when its marker character is present at all,
+    # which skips every regex for ordinary plain-text fields.
+    if "*" in text:
+        text = _MD_BOLD_STAR.sub(r"\1", text)
+    if "_" in text:
+        text = _MD_BOLD_UND.sub(r"\1", text)
+    if "*" in text:
+        text = _MD_IT_STAR.sub(r"\1", text)
+    if "_" in text:
+        text = _MD_IT_UND.sub(r"\1", text)
     return text
 
 
@@ -389,10 +683,10 @@ def _clean_raw_text(raw_content: str) -> str:
     """Clean raw LLM output when JSON parsing completely fails."""
     text = raw_content.strip()
     # Remove code fences
-    text = re.sub(r"^```(?:json)?\s*\n?", "", text)
-    text = re.sub(r"\n?\s*```\s*$", "", text)
+    text = _FENCE_LEAD.sub("", text)
+    text = _FENCE_TRAIL.sub("", text)
     # If the text looks like a JSON wrapper, extract the summary value
-    m = re.search(r'"summary"\s*:\s*"((?:[^"\\]|\\.)*)"', text)
+    m = _SUMMARY_EXTRACT.search(text)
     if m:
         extracted = m.group(1)
         extracted = extracted.replace('\\"', '"').replace("\\n", "\n").replace("\\t", "\t")
@@ -412,30 +706,36 @@ def _extract_json(text: str) -> Optional[Dict[str, Any]]:
     """
     # Strip markdown code fences
     cleaned = text.strip()
-    cleaned = re.sub(r"^```(?:json)?\s*\n?", "", cleaned)
-    cleaned = re.sub(r"\n?\s*```\s*$", "", cleaned)
+    cleaned = _FENCE_LEAD.sub("", cleaned)
+    cleaned = _FENCE_TRAIL.sub("", cleaned)
     cleaned = cleaned.strip()
 
     # Try balanced-brace parsing
-    parsed = _parse_balanced_json(cleaned)
+    parsed = _first_json_obj(cleaned)
     if parsed is None:
         return None
 
+    return _unwrap_fields(parsed)
+
+
+def _unwrap_fields(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Unwrap fenced JSON in the summary and strip code fences from fields."""
     # Post-process: if a field itself contains fenced JSON, unwrap it
     summary = parsed.get("summary", "")
     if isinstance(summary, str) and summary.strip().startswith("```"):
-        inner_cleaned = re.sub(r"^```(?:json)?\s*\n?", "", summary.strip())
-        inner_cleaned = re.sub(r"\n?\s*```\s*$", "", inner_cleaned)
-        inner = _parse_balanced_json(inner_cleaned.strip())
+        inner_cleaned = _FENCE_LEAD.sub("", summary.strip())
+        inner_cleaned = _FENCE_TRAIL.sub("", inner_cleaned)
+        inner = _first_json_obj(inner_cleaned.strip())
         if inner and isinstance(inner, dict) and "summary" in inner:
             parsed = inner
 
-    # Strip code fences from individual fields
-    for key in ("summary", "relevant_law", "your_rights", "disclaimer"):
+    # Strip code fences from individual fields (both patterns need "```")
+    for key in _TEXT_FIELDS:
         val = parsed.get(key, "")
         if isinstance(val, str):
-            val = re.sub(r"^```(?:json)?\s*\n?", "", val)
-            val = re.sub(r"\n?\s*```\s*$", "", val)
+            if "```" in val:
+                val = _FENCE_LEAD.sub("", val)
+                val = _FENCE_TRAIL.sub("", val)
             parsed[key] = val.strip()
 
     return parsed
@@ -447,8 +747,8 @@ def _recover_truncated_json(text: str) -> Optional[Dict[str, Any]]:
     The LLM often runs out of tokens mid-response, leaving unclosed braces.
     """
     cleaned = text.strip()
-    cleaned = re.sub(r"^```(?:json)?\s*\n?", "", cleaned)
-    cleaned = re.sub(r"\n?\s*```\s*$", "", cleaned)
+    cleaned = _FENCE_LEAD.sub("", cleaned)
+    cleaned = _FENCE_TRAIL.sub("", cleaned)
     cleaned = cleaned.strip()
 
     start = cleaned.find("{")
@@ -457,147 +757,102 @@ def _recover_truncated_json(text: str) -> Optional[Dict[str, Any]]:
 
     fragment = cleaned[start:]
 
-    # Count unclosed braces and brackets
-    in_string = False
-    escape = False
-    open_braces = 0
-    open_brackets = 0
-
-    for ch in fragment:
-        if escape:
-            escape = False
-            continue
-        if ch == "\\":
-            escape = True
-            continue
-        if ch == '"' and not escape:
-            in_string = not in_string
-            continue
-        if in_string:
-            continue
-        if ch == "{":
-            open_braces += 1
-        elif ch == "}":
-            open_braces -= 1
-        elif ch == "[":
-            open_brackets += 1
-        elif ch == "]":
-            open_brackets -= 1
-
+    open_braces, open_brackets, in_string = _scan(fragment)
     if open_braces <= 0 and open_brackets <= 0:
         return None  # Not actually truncated
 
-    # Try to close the fragment
-    # First, if we're inside a string, close it
-    # Count quotes to determine if we're in a string
-    in_str = False
-    esc = False
-    for ch in fragment:
-        if esc:
-            esc = False
-            continue
-        if ch == "\\":
-            esc = True
-            continue
-        if ch == '"':
-            in_str = not in_str
-
+    # Try to close the fragment: end any open string, then close
+    # brackets and braces
     repaired = fragment
-    if in_str:
+    if in_string:
         repaired += '"'
-
-    # Now close brackets and braces
     repaired += "]" * max(0, open_brackets)
     repaired += "}" * max(0, open_braces)
 
     try:
-        result = json.loads(repaired)
+        result = orjson.loads(repaired)
         if isinstance(result, dict):
             logger.info("Recovered truncated JSON successfully")
             return result
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         pass
 
     # More aggressive: try to repair newlines first, then close
     repaired_text = _repair_newlines(fragment)
-    in_str = False
-    esc = False
-    for ch in repaired_text:
-        if esc:
-            esc = False
-            continue
-        if ch == "\\":
-            esc = True
-            continue
-        if ch == '"':
-            in_str = not in_str
-
+    ob, osb, in_str = _scan(repaired_text)
     if in_str:
         repaired_text += '"'
-
-    # Recount braces
-    ob, osb = 0, 0
-    in_s, es = False, False
-    for ch in repaired_text:
-        if es:
-            es = False
-            continue
-        if ch == "\\":
-            es = True
-            continue
-        if ch == '"':
-            in_s = not in_s
-            continue
-        if in_s:
-            continue
-        if ch == "{": ob += 1
-        elif ch == "}": ob -= 1
-        elif ch == "[": osb += 1
-        elif ch == "]": osb -= 1
-
     repaired_text += "]" * max(0, osb)
     repaired_text += "}" * max(0, ob)
 
     try:
-        result = json.loads(repaired_text)
+        result = orjson.loads(repaired_text)
         if isinstance(result, dict):
             logger.info("Recovered truncated JSON (with newline repair) successfully")
             return result
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         pass
 
     return None
 
 
-def _repair_newlines(text: str) -> str:
-    """Escape unescaped newlines inside JSON strings."""
-    chars = []
-    in_string = False
-    escape = False
+_QUOTE, _BACKSLASH = ord('"'), ord("\\")
+_LBRACE, _RBRACE, _LBRACKET, _RBRACKET = ord("{"), ord("}"), ord("["), ord("]")
 
-    for ch in text:
+
+def _scan(fragment: str) -> Tuple[int, int, bool]:
+    """
+    Single pass over a JSON fragment returning
+    (unclosed braces, unclosed brackets, ends inside a string).
+
+    Iterates the UTF-8 bytes: ints compare faster than 1-char strs, and
+    multi-byte sequences never collide with the ASCII structural chars.
+    """
+    open_braces = open_brackets = 0
+    in_string = escape = False
+    for b in fragment.encode("utf-8", "surrogatepass"):
         if escape:
-            chars.append(ch)
             escape = False
-            continue
-        if ch == "\\":
-            chars.append(ch)
+        elif b == _BACKSLASH:
             escape = True
-            continue
-        if ch == '"':
+        elif b == _QUOTE:
             in_string = not in_string
-            chars.append(ch)
+        elif in_string:
             continue
-        if in_string and ch == "\n":
-            chars.append("\\n")
-        elif in_string and ch == "\r":
-            pass
-        elif in_string and ch == "\t":
-            chars.append("\\t")
-        else:
-            chars.append(ch)
+        elif b == _LBRACE:
+            open_braces += 1
+        elif b == _RBRACE:
+            open_braces -= 1
+        elif b == _LBRACKET:
+            open_brackets += 1
+        elif b == _RBRACKET:
+            open_brackets -= 1
+    return open_braces, open_brackets, in_string
+
 
-    return "".join(chars)
+# A backslash pair outside a string, or a whole string literal. The closing
+# quote is optional so an unterminated trailing string is repaired too.
+_STRING_LITERAL = re.compile(r'\\.|"(?:[^"\\]|\\.)*(?:"|\\?\Z)', re.DOTALL)
+_STRING_CONTROL = re.compile(r"\\.|[\n\r\t]", re.DOTALL)
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "", "\t": "\\t"}
+
+
+def _escape_controls(match: re.Match) -> str:
+    literal = match.group(0)
+    if literal[0] != '"':
+        return literal
+    if "\\\n" in literal or "\\\r" in literal or "\\\t" in literal:
+        # A backslash directly before a control char escapes it; keep the
+        # pair as-is and only rewrite bare control chars.
+        return _STRING_CONTROL.sub(
+            lambda m: _CONTROL_ESCAPES.get(m.group(0), m.group(0)), literal
+        )
+    return literal.replace("\r", "").replace("\n", "\\n").replace("\t", "\\t")
+
+
+def _repair_newlines(text: str) -> str:
+    """Escape unescaped newlines inside JSON strings."""
+    return _STRING_LITERAL.sub(_escape_controls, text)
 
 
 def _repair_and_parse_json(text: str) -> Optional[Dict[str, Any]]:
@@ -605,57 +860,83 @@ def _repair_and_parse_json(text: str) -> Optional[Dict[str, Any]]:
     Attempt to repair invalid JSON strings (e.g. unescaped newlines inside quotes)
     and parse them.
     """
-    cleaned = re.sub(r"^```(?:json)?\s*\n?", "", text.strip())
-    cleaned = re.sub(r"\n?\s*```\s*$", "", cleaned)
+    cleaned = _FENCE_LEAD.sub("", text.strip())
+    cleaned = _FENCE_TRAIL.sub("", cleaned)
 
     try:
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
+        return orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
         pass
 
     repaired = _repair_newlines(cleaned)
-    return _parse_balanced_json(repaired)
+    return _first_json_obj(repaired)
 
 
-def _parse_balanced_json(text: str) -> Optional[Dict[str, Any]]:
+_DECODER = json.JSONDecoder()
+
+
+def _first_json_obj(text: str) -> Optional[Dict[str, Any]]:
     """
-    Find the first balanced { ... } in text and parse it as JSON.
-    This is more reliable than regex for nested objects.
+    Parse the first JSON object in text.
+
+    Well-formed output is decoded in place by `raw_decode`, which finds the
+    object's end itself, so the common case never runs a Python-level scan.
+    Malformed output falls back to `_parse_balanced_json`, which skips the
+    whole failed object before looking for another one (retrying at the
+    next "{" instead would surface nested fragments like a next_steps item).
     """
     start = text.find("{")
     if start == -1:
         return None
+    try:
+        return _DECODER.raw_decode(text, start)[0]
+    except ValueError:
+        return _parse_balanced_json(text)
 
-    depth = 0
-    in_string = False
-    escape = False
 
-    for i in range(start, len(text)):
-        ch = text[i]
-        if escape:
-            escape = False
-            continue
-        if ch == "\\":
-            escape = True
-            continue
-        if ch == '"':
-            in_string = not in_string
-            continue
-        if in_string:
-            continue
-        if ch == "{":
-            depth += 1
-        elif ch == "}":
-            depth -= 1
-            if depth == 0:
-                candidate = text[start : i + 1]
-                try:
-                    return json.loads(candidate)
-                except json.JSONDecodeError:
-                    # Try to find another JSON object later in the text
-                    next_start = text.find("{", i + 1)
-                    if next_start != -1:
-                        return _parse_balanced_json(text[next_start:])
-                    return None
+# Characters that can change brace depth or string state, outside and
+# inside a string literal respectively.
+_STRUCTURAL = re.compile(r'[{}"\\]')
+_STRING_STRUCTURAL = re.compile(r'["\\]')
+
+
+def _parse_balanced_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Find the first balanced { ... } in text and parse it as JSON.
+    This is more reliable than regex for nested objects.
+
+    Hops between structural characters with a regex search rather than
+    visiting every character; if a candidate fails to parse, scanning
+    resumes at the next "{" after it.
+    """
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        in_string = False
+        pos = start
+        while True:
+            match = (_STRING_STRUCTURAL if in_string else _STRUCTURAL).search(text, pos)
+            if match is None:
+                return None
+            i = match.start()
+            ch = text[i]
+            if ch == "\\":
+                pos = i + 2
+                continue
+            pos = i + 1
+            if ch == '"':
+                in_string = not in_string
+            elif ch == "{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    break
+
+        try:
+            return orjson.loads(text[start:pos])
+        except orjson.JSONDecodeError:
+            # Try to find another JSON object later in the text
+            start = text.find("{", pos)
 
     return None
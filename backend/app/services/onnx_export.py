@@ -0,0 +1,62 @@
+"""
+NyayaAI – ONNX Embedding Export
+=================================
+One-time conversion of the sentence-transformer encoder to ONNX with dynamic
+int8 quantization, for use with EMBEDDING_BACKEND=onnx.
+
+Requires the optional export dependencies:
+    pip install "optimum[onnxruntime]"
+
+Usage (from backend/ directory):
+    python -m app.services.onnx_export
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from loguru import logger
+
+# Ensure the backend root is on sys.path when run as a script
+_BACKEND_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BACKEND_ROOT))
+
+from app.config import settings
+
+
+def export_quantized_model(output_dir: str | None = None) -> Path:
+    """
+    Export settings.EMBEDDING_MODEL to ONNX and quantize it to int8.
+
+    Writes model.onnx, model_quantized.onnx and the tokenizer files to
+    `output_dir` (defaults to settings.EMBEDDING_ONNX_PATH).
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    out_dir = Path(output_dir or settings.EMBEDDING_ONNX_PATH)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info("Exporting {model} to ONNX...", model=settings.EMBEDDING_MODEL)
+    model = ORTModelForFeatureExtraction.from_pretrained(settings.EMBEDDING_MODEL, export=True)
+    model.save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(settings.EMBEDDING_MODEL).save_pretrained(out_dir)
+
+    # Dynamic int8 quantization: weights are quantized now, activations at
+    # runtime, so no calibration data is needed. The avx512_vnni config also
+    # runs on AVX2-only CPUs, just without the VNNI speedup.
+    logger.info("Quantizing ONNX model to int8...")
+    quantizer = ORTQuantizer.from_pretrained(out_dir)
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=out_dir, quantization_config=qconfig)
+
+    logger.info("Quantized ONNX model saved to {path}", path=out_dir)
+    return out_dir
+
+
+# ── CLI entry point ──────────────────────────────────────────────────────
+if __name__ == "__main__":
+    export_quantized_model()
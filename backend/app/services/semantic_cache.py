@@ -0,0 +1,113 @@
+"""
+NyayaAI – Semantic LLM Cache
+==============================
+Nearest-neighbour cache of LLM responses keyed on query embeddings, so that
+paraphrases of an already-answered question can reuse its answer.
+
+Entries are partitioned by scope (model candidates + language) so a hit can
+never cross languages or models. Each partition is a small in-memory FAISS
+inner-product index over L2-normalised embeddings, i.e. cosine similarity.
+"""
+
+from __future__ import annotations
+
+import functools
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from app.config import settings
+
+
+@functools.lru_cache(maxsize=1024)
+def embed_cache_query(normalised_query: str) -> np.ndarray:
+    """Embed a normalised query, memoised (callers must not mutate the result)."""
+    # Lazy import avoids loading torch/sentence-transformers at app startup.
+    from app.services.embedding_service import embedding_service
+
+    return embedding_service.embed_query(normalised_query)
+
+
+class _Partition:
+    """Embeddings and responses for one cache scope."""
+
+    def __init__(self, dimension: int) -> None:
+        self.index = faiss.IndexFlatIP(dimension)
+        self.vectors: List[np.ndarray] = []
+        self.entries: List[Tuple[float, Dict[str, Any]]] = []  # (expires_at, response)
+
+    def rebuild(self, keep_from: int) -> None:
+        """Drop the oldest `keep_from` entries and re-index the rest."""
+        self.vectors = self.vectors[keep_from:]
+        self.entries = self.entries[keep_from:]
+        self.index.reset()
+        if self.vectors:
+            self.index.add(np.vstack(self.vectors))
+
+
+class SemanticCache:
+    """
+    Returns a stored response when a new query's embedding has cosine
+    similarity above `threshold` with a cached one in the same scope.
+
+    Not thread-safe: intended to be used from the event loop only.
+    """
+
+    def __init__(self, threshold: float, maxsize: int, ttl: float) -> None:
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._partitions: Dict[Hashable, _Partition] = {}
+
+    def lookup(self, scope: Hashable, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the closest cached response above the threshold, if any."""
+        partition = self._partitions.get(scope)
+        if partition is None or partition.index.ntotal == 0:
+            return None
+
+        scores, ids = partition.index.search(embedding.reshape(1, -1), 1)
+        idx = int(ids[0][0])
+        if idx == -1 or scores[0][0] < self.threshold:
+            return None
+
+        expires_at, response = partition.entries[idx]
+        if expires_at < time.monotonic():
+            return None
+        return response
+
+    def add(self, scope: Hashable, embedding: np.ndarray, response: Dict[str, Any]) -> None:
+        """
+        Store a response. Expired entries are dropped first, so a stale
+        nearest neighbour cannot keep shadowing fresh paraphrase hits; if
+        the scope is still full, the oldest quarter is evicted as well.
+        """
+        partition = self._partitions.get(scope)
+        if partition is None:
+            partition = self._partitions[scope] = _Partition(embedding.shape[-1])
+
+        # TTL is uniform, so entries expire in insertion order.
+        now = time.monotonic()
+        drop = 0
+        for expires_at, _ in partition.entries:
+            if expires_at >= now:
+                break
+            drop += 1
+        if len(partition.entries) - drop >= self.maxsize:
+            drop = max(drop, self.maxsize // 4, 1)
+        if drop:
+            partition.rebuild(keep_from=drop)
+
+        vector = embedding.reshape(1, -1)
+        partition.index.add(vector)
+        partition.vectors.append(vector)
+        partition.entries.append((now + self.ttl, response))
+
+
+# ── Module-level convenience instance ────────────────────────────────────
+semantic_cache = SemanticCache(
+    threshold=settings.LLM_SEMANTIC_CACHE_THRESHOLD,
+    maxsize=settings.LLM_SEMANTIC_CACHE_MAXSIZE,
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,67 @@
+"""
+NyayaAI – Response Cache
+==========================
+Bounded in-memory LRU cache with per-entry expiry, used to serve repeated
+questions without re-running retrieval and the LLM call.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from app.config import settings
+
+
+class TTLCache:
+    """
+    LRU mapping whose entries expire `ttl` seconds after being stored.
+
+    Not thread-safe: it is only meant to be used from the event loop, where
+    get/set never yield and therefore need no lock.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries when full."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def make_response_key(query: str, language: str) -> bytes:
+    """Hash the normalised query and language into a compact cache key."""
+    normalised = f"{language}|{query.strip().lower()}"
+    return hashlib.blake2b(normalised.encode("utf-8"), digest_size=16).digest()
+
+
+# ── Module-level convenience instance ────────────────────────────────────
+response_cache = TTLCache(
+    maxsize=settings.RESPONSE_CACHE_MAXSIZE,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
@@ -5,6 +5,8 @@ Input sanitisation and validation to prevent prompt injection and abuse.
 """
 
 import re
+from typing import Optional
+
 from loguru import logger
 
 
@@ -23,13 +25,25 @@ INJECTION_PATTERNS = [
     r"\[\/INST\]",
 ]
 
-_compiled_patterns = [re.compile(p, re.IGNORECASE) for p in INJECTION_PATTERNS]
+# Null bytes and non-printable control chars (newlines and tabs are kept),
+# mapped to None for str.translate.
+_CTRL_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F])
+
+_WS = re.compile(r"[ \t]+")
+_NL = re.compile(r"\n{3,}")
 
+# One alternation so the input is scanned once rather than once per pattern.
+_INJECTION_RE = re.compile(
+    "|".join(f"(?:{p})" for p in INJECTION_PATTERNS), re.IGNORECASE
+)
 
-def sanitize_input(text: str) -> str:
+
+def sanitize_input(text: str, max_length: Optional[int] = None) -> str:
     """
     Sanitise user input:
-    1. Strip leading/trailing whitespace.
+    1. Strip leading/trailing whitespace, and reject text longer than
+       `max_length` before any regex work (pass settings.MAX_QUERY_LENGTH so
+       oversized payloads are never scanned).
     2. Remove null bytes and control characters.
     3. Collapse excessive whitespace.
     4. Check for prompt-injection patterns (log a warning but do NOT block – the LLM
@@ -39,22 +53,25 @@ def sanitize_input(text: str) -> str:
     """
     # Step 1 – strip
     text = text.strip()
+    if max_length is not None and len(text) > max_length:
+        raise ValueError(
+            f"Query too long. Maximum length is {max_length} characters."
+        )
 
     # Step 2 – remove null bytes and non-printable control chars (keep newlines, tabs)
-    text = re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]", "", text)
+    text = text.translate(_CTRL_TABLE)
 
     # Step 3 – collapse whitespace runs
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _WS.sub(" ", text)
+    text = _NL.sub("\n\n", text)
 
     # Step 4 – injection detection (warn only)
-    for pattern in _compiled_patterns:
-        if pattern.search(text):
-            logger.warning(
-                "Potential prompt-injection detected in input: {pattern}",
-                pattern=pattern.pattern,
-            )
-            break  # one warning is enough
+    match = _INJECTION_RE.search(text)
+    if match:
+        logger.warning(
+            "Potential prompt-injection detected in input: {match!r}",
+            match=match.group(0),
+        )
 
     return text
 
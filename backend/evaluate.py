@@ -4,22 +4,38 @@ NyayaAI – Evaluation Script
 Tests the RAG pipeline with 10 sample Indian legal questions.
 Prints retrieved chunks and generated answers for manual inspection.
 
+Answers are checkpointed to results.jsonl, keyed by model, language and
+query, so re-runs only call the LLM for new or changed questions.
+
 Usage (from backend/ directory):
-    python evaluate.py
+    python evaluate.py            # reuse checkpointed answers
+    python evaluate.py --force    # re-ask every question
 """
 
+import argparse
 import asyncio
+import hashlib
 import sys
 import time
 from pathlib import Path
+from typing import Any, Dict, List
 
 # Ensure backend root is on path
 _BACKEND_ROOT = Path(__file__).resolve().parent
 if str(_BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(_BACKEND_ROOT))
 
+import orjson
+
+from app.config import settings
 from app.rag.retriever import retriever
-from app.services.llm_service import call_llm
+from app.services.llm_service import call_llm, close_client
+
+# Questions in flight at once; bounded to stay under provider rate limits.
+EVAL_CONCURRENCY = 4
+
+# Checkpoint of answered questions, one {"qhash", "query", "response"} per line.
+RESULTS_PATH = _BACKEND_ROOT / "results.jsonl"
 
 # ── Test questions covering diverse legal areas ──────────────────────────
 TEST_QUESTIONS = [
@@ -86,7 +102,109 @@ def print_header(text: str):
     print_separator()
 
 
-async def evaluate():
+def question_hash(q: dict) -> str:
+    """Checkpoint key: changes when the model, language or query changes."""
+    key = f"{settings.MODEL_NAME}|{q['language']}|{q['query']}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def load_results(path: Path) -> Dict[str, dict]:
+    """Load checkpointed responses by qhash (later lines win)."""
+    done: Dict[str, dict] = {}
+    if not path.exists():
+        return done
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = orjson.loads(line)
+                done[record["qhash"]] = record["response"]
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                continue  # partial line from an interrupted run
+    return done
+
+
+async def run_one(
+    i: int,
+    q: dict,
+    chunks: List[Dict[str, Any]],
+    sem: asyncio.Semaphore,
+    done: Dict[str, dict],
+    results_file,
+) -> dict:
+    """Call the LLM for one question with its prefetched context."""
+    qhash = question_hash(q)
+    response = done.get(qhash)
+    cached = response is not None
+    error = None
+    llm_time = 0.0
+
+    if not cached:
+        async with sem:
+            try:
+                t1 = time.time()
+                response = await call_llm(
+                    user_query=q["query"],
+                    context_chunks=chunks,
+                    language=q["language"],
+                )
+                llm_time = time.time() - t1
+            except Exception as e:
+                error = e
+
+        # Only checkpoint real answers, not the raw-text fallback for
+        # unparseable output (same rule as the LLM and /ask caches).
+        if error is None and (response.get("relevant_law") or response.get("next_steps")):
+            record = {"qhash": qhash, "query": q["query"], "response": response}
+            results_file.write(orjson.dumps(record) + b"\n")
+            results_file.flush()
+
+    return {
+        "index": i,
+        "question": q,
+        "chunks": chunks,
+        "response": response,
+        "llm_time": llm_time,
+        "cached": cached,
+        "error": error,
+    }
+
+
+def print_result(result: dict):
+    """Print one question's retrieved chunks and LLM answer."""
+    i, q = result["index"], result["question"]
+    chunks = result["chunks"]
+
+    print(f"\n{'─' * 80}")
+    print(f"[Q{i}/{len(TEST_QUESTIONS)}] ({q['category']}) [{q['language'].upper()}]")
+    print(f"  Query: {q['query']}")
+    print(f"{'─' * 80}")
+
+    print(f"\n  📚 Retrieved {len(chunks)} chunks")
+    for j, chunk in enumerate(chunks, 1):
+        print(f"\n  [Chunk {j}]")
+        print(f"    Law: {chunk.get('law', 'N/A')}")
+        print(f"    Section: {chunk.get('section', 'N/A')}")
+        print(f"    Score: {chunk.get('score', 'N/A'):.4f}")
+        print(f"    Text: {chunk['text'][:200]}...")
+
+    if result["error"] is not None:
+        print(f"\n  ❌ LLM Error: {result['error']}")
+        return
+
+    response = result["response"]
+    timing = "checkpoint" if result["cached"] else f"{result['llm_time']:.2f}s"
+    print(f"\n  🤖 LLM Response ({timing}):")
+    print(f"    Summary: {response.get('summary', 'N/A')[:300]}")
+    print(f"    Relevant Law: {response.get('relevant_law', 'N/A')}")
+    print(f"    Rights: {response.get('your_rights', 'N/A')[:200]}")
+    next_steps = response.get("next_steps", [])
+    if next_steps:
+        print(f"    Next Steps:")
+        for step in next_steps:
+            print(f"      • {step}")
+
+
+async def evaluate(force: bool = False):
     """Run all test questions through the RAG pipeline and print results."""
     print_header("NyayaAI – Evaluation Suite")
     print(f"Total questions: {len(TEST_QUESTIONS)}\n")
@@ -103,62 +221,60 @@ async def evaluate():
             print(f"  {q['query']}")
         return
 
-    total_retrieval_time = 0
-    total_llm_time = 0
+    t_start = time.time()
 
-    for i, q in enumerate(TEST_QUESTIONS, 1):
-        print(f"\n{'─' * 80}")
-        print(f"[Q{i}/{len(TEST_QUESTIONS)}] ({q['category']}) [{q['language'].upper()}]")
-        print(f"  Query: {q['query']}")
-        print(f"{'─' * 80}")
-
-        # Retrieval
-        t0 = time.time()
-        chunks = retriever.retrieve(q["query"])
-        retrieval_time = time.time() - t0
-        total_retrieval_time += retrieval_time
-
-        print(f"\n  📚 Retrieved {len(chunks)} chunks ({retrieval_time:.2f}s)")
-        for j, chunk in enumerate(chunks, 1):
-            print(f"\n  [Chunk {j}]")
-            print(f"    Law: {chunk.get('law', 'N/A')}")
-            print(f"    Section: {chunk.get('section', 'N/A')}")
-            print(f"    Score: {chunk.get('score', 'N/A'):.4f}")
-            print(f"    Text: {chunk['text'][:200]}...")
-
-        # LLM call
-        try:
-            t1 = time.time()
-            response = await call_llm(
-                user_query=q["query"],
-                context_chunks=chunks,
-                language=q["language"],
+    # Retrieval: every query in one embedding pass and one FAISS search,
+    # run in a worker thread so the event loop (and the HTTP client) is
+    # never blocked by the encoder forward pass or the search.
+    all_chunks = await asyncio.to_thread(
+        retriever.retrieve_batch, [q["query"] for q in TEST_QUESTIONS]
+    )
+    total_retrieval_time = time.time() - t_start
+
+    done = {} if force else load_results(RESULTS_PATH)
+    sem = asyncio.Semaphore(EVAL_CONCURRENCY)
+    with open(RESULTS_PATH, "ab") as results_file:
+        results = await asyncio.gather(
+            *(
+                run_one(i, q, chunks, sem, done, results_file)
+                for i, (q, chunks) in enumerate(zip(TEST_QUESTIONS, all_chunks), 1)
             )
-            llm_time = time.time() - t1
-            total_llm_time += llm_time
-
-            print(f"\n  🤖 LLM Response ({llm_time:.2f}s):")
-            print(f"    Summary: {response.get('summary', 'N/A')[:300]}")
-            print(f"    Relevant Law: {response.get('relevant_law', 'N/A')}")
-            print(f"    Rights: {response.get('your_rights', 'N/A')[:200]}")
-            next_steps = response.get("next_steps", [])
-            if next_steps:
-                print(f"    Next Steps:")
-                for step in next_steps:
-                    print(f"      • {step}")
-        except Exception as e:
-            print(f"\n  ❌ LLM Error: {e}")
+        )
+    wall_time = time.time() - t_start
+
+    total_llm_time = 0
+    for result in results:
+        print_result(result)
+        total_llm_time += result["llm_time"]
 
     # Summary
     print_header("Evaluation Summary")
     print(f"  Questions tested:       {len(TEST_QUESTIONS)}")
+    print(f"  From checkpoint:        {sum(r['cached'] for r in results)}")
+    print(f"  Wall time:              {wall_time:.2f}s")
     print(f"  Total retrieval time:   {total_retrieval_time:.2f}s")
     print(f"  Avg retrieval time:     {total_retrieval_time / len(TEST_QUESTIONS):.2f}s")
     if total_llm_time > 0:
         print(f"  Total LLM time:         {total_llm_time:.2f}s")
-        print(f"  Avg LLM time:           {total_llm_time / len(TEST_QUESTIONS):.2f}s")
+        asked = sum(not r["cached"] for r in results)
+        print(f"  Avg LLM time:           {total_llm_time / asked:.2f}s")
     print_separator()
 
 
+async def main():
+    parser = argparse.ArgumentParser(description="Evaluate the NyayaAI RAG pipeline.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=f"ignore checkpointed answers in {RESULTS_PATH.name} and re-ask every question",
+    )
+    args = parser.parse_args()
+
+    try:
+        await evaluate(force=args.force)
+    finally:
+        await close_client()
+
+
 if __name__ == "__main__":
-    asyncio.run(evaluate())
+    asyncio.run(main())